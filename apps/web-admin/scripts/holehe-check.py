@@ -2,107 +2,512 @@
 """
 Holehe Email Checker - Check if email is registered on 120+ sites
 Usage: python3 holehe-check.py email@example.com
-Output: JSON with found accounts
+       python3 holehe-check.py --server   (one email per stdin line)
+       python3 holehe-check.py --socket [/tmp/holehe.sock]   (daemon, one
+                                         email per line per connection)
+       python3 holehe-check.py --stream email@example.com
+       python3 holehe-check.py --emails-file emails.txt   (one email per
+                                         line; one JSON line per email)
+Output: JSON with found accounts (--stream: one NDJSON line per found
+        account as it arrives, then a {"count": N, "done": true} line)
+Optional speed-ups: pip3 install 'httpx[http2]' aiodns orjson uvloop
+(HTTP/2 lets modules that share an origin multiplex one connection)
 """
 
+import os
+import re
 import sys
 import json
+import math
+import signal
+import socket
 import asyncio
+import inspect
+import operator
+import ipaddress
 
 try:
     import httpx
+    import httpcore
     from holehe import core
 except ImportError:
     print(json.dumps({"error": "holehe not installed. Run: pip3 install holehe"}))
     sys.exit(1)
 
-async def check_email(email):
-    """Check email against all Holehe modules"""
-    results = []
+# HTTP/2 needs the h2 package (httpx[http2]); without it the client
+# falls back to HTTP/1.1 with one connection per in-flight request
+try:
+    import h2  # noqa: F401
+    _HTTP2 = True
+except ImportError:
+    _HTTP2 = False
+
+try:
+    import aiodns
+except ImportError:
+    aiodns = None
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Not available on Windows
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+# Set HOLEHE_DEBUG to report failed or timed-out modules (with the queried
+# email) on stderr; several of the ~120 modules fail routinely
+_DEBUG = bool(os.environ.get('HOLEHE_DEBUG'))
+
+_EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Resolve holehe modules once per process. Prefer the static registry written
+# by holehe-registry-gen.py; otherwise walk holehe.modules, where each module
+# exposes a function with the same name as the file
+try:
+    from holehe_registry import GEN_MODULES as _MODULES, GEN_HOSTS as _HOSTS
+except ImportError as e:
+    # A missing registry is expected; a stale one (importing a holehe module
+    # that no longer exists) needs regenerating, so say so
+    if not (isinstance(e, ModuleNotFoundError) and e.name == 'holehe_registry'):
+        sys.stderr.write(
+            f"holehe_registry is stale ({e}); re-run holehe-registry-gen.py. "
+            "Falling back to module discovery.\n"
+        )
+    _MODULES = [
+        (name.split('.')[-1], getattr(module, name.split('.')[-1]))
+        for name, module in core.import_submodules('holehe.modules').items()
+        if hasattr(module, name.split('.')[-1])
+    ]
+    # Without the registry, hosts are resolved (and cached) on first connect
+    _HOSTS = []
+
+# Per-module and whole-run time budgets (seconds), and the cap on in-flight
+# checks. The cap matches the connection pool and sits above the ~120 holehe
+# modules, so for one email every module starts at once and the worst case is
+# MODULE_TIMEOUT, never later than GLOBAL_TIMEOUT. A batch shares the slots,
+# so its budget grows by GLOBAL_TIMEOUT per wave of MAX_CONCURRENCY checks.
+MODULE_TIMEOUT = 8.0
+GLOBAL_TIMEOUT = 15.0
+MAX_CONCURRENCY = 200
+
+# Per-phase HTTP timeouts so an unreachable host fails fast on connect
+HTTP_TIMEOUT = httpx.Timeout(connect=3.0, read=6.0, write=3.0, pool=2.0)
+
+# Default Unix socket for daemon mode
+SOCKET_PATH = '/tmp/holehe.sock'
+
+# How long a resolved address is reused, in seconds
+DNS_TTL = 300.0
+
+# host -> (expiry in loop time, IPv4 address)
+_DNS_CACHE = {}
+
+# Shared HTTP client and DNS resolver, created lazily inside the running
+# event loop and reused across emails in server mode
+_CLIENT = None
+_RESOLVER = None
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """Network backend that connects through the shared DNS cache
+
+    TLS still verifies against the original hostname, which httpcore
+    passes separately as the SNI name.
+    """
+
+    def __init__(self):
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        try:
+            address = await resolve_host(host)
+        except Exception:
+            address = host
+        return await self._backend.connect_tcp(
+            address, port, timeout=timeout,
+            local_address=local_address, socket_options=socket_options,
+        )
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(
+            path, timeout=timeout, socket_options=socket_options,
+        )
+
+    async def sleep(self, seconds):
+        await self._backend.sleep(seconds)
+
+def get_client():
+    """Get the process-wide AsyncClient"""
+    global _CLIENT
+    if _CLIENT is None:
+        transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(max_connections=MAX_CONCURRENCY, max_keepalive_connections=100),
+            http2=_HTTP2,
+        )
+        # httpx has no public hook for the network backend
+        transport._pool._network_backend = CachingDNSBackend()
+        _CLIENT = httpx.AsyncClient(timeout=HTTP_TIMEOUT, transport=transport)
+    return _CLIENT
+
+def get_resolver():
+    """Get the process-wide aiodns resolver"""
+    global _RESOLVER
+    if _RESOLVER is None:
+        _RESOLVER = aiodns.DNSResolver()
+    return _RESOLVER
+
+async def close_client():
+    """Close the shared AsyncClient and resolver if they were opened"""
+    global _CLIENT, _RESOLVER
+    if _CLIENT is not None:
+        await _CLIENT.aclose()
+        _CLIENT = None
+    if _RESOLVER is not None:
+        # close() only exists (as a coroutine) from aiodns 4
+        close = getattr(_RESOLVER, 'close', None)
+        if close is not None:
+            result = close()
+            if inspect.isawaitable(result):
+                await result
+        _RESOLVER = None
+
+async def resolve_host(host):
+    """Resolve host to an IPv4 address, reusing cached answers"""
+    try:
+        ipaddress.ip_address(host)
+        return host
+    except ValueError:
+        pass
+
+    loop = asyncio.get_running_loop()
+    cached = _DNS_CACHE.get(host)
+    if cached is not None and cached[0] > loop.time():
+        return cached[1]
+
+    # aiodns.getaddrinfo is only available from aiodns 3.2
+    if aiodns is not None and hasattr(aiodns.DNSResolver, 'getaddrinfo'):
+        result = await get_resolver().getaddrinfo(host, family=socket.AF_INET)
+        address = result.nodes[0].addr[0]
+        if isinstance(address, bytes):
+            address = address.decode()
+    else:
+        infos = await loop.getaddrinfo(host, None, family=socket.AF_INET, type=socket.SOCK_STREAM)
+        address = infos[0][4][0]
+
+    _DNS_CACHE[host] = (loop.time() + DNS_TTL, address)
+    return address
+
+async def prefetch_dns():
+    """Warm the DNS cache for every host the holehe modules contact"""
+    if _HOSTS:
+        await asyncio.gather(*(resolve_host(host) for host in _HOSTS), return_exceptions=True)
+
+async def is_checkable(email):
+    """Cheap syntax and domain checks before fanning out to every site"""
+    if not _EMAIL_RE.match(email):
+        return False
+    if aiodns is None:
+        return True
+
+    # Only a non-existent domain rules the address out; other DNS failures
+    # (timeouts, no MX but an A record) still get checked
+    domain = email.rsplit('@', 1)[1]
+    resolver = get_resolver()
+    query = getattr(resolver, 'query_dns', None) or resolver.query
+    try:
+        await query(domain, 'MX')
+    except aiodns.error.DNSError as e:
+        return not (e.args and e.args[0] == aiodns.error.ARES_ENOTFOUND)
+    return True
+
+async def check_email(email, on_found=None, sem=None, timeout=GLOBAL_TIMEOUT):
+    """Check email against all Holehe modules
+
+    on_found, if given, is called with each found account as soon as its
+    module finishes. sem lets several emails share concurrency slots.
+    Returns None when the email is rejected before any site is checked.
+    """
     found = []
 
-    async with httpx.AsyncClient(timeout=30.0) as client:
-        # Get all modules from holehe
-        modules = core.import_submodules('holehe.modules')
-
-        # Create tasks for all checks
-        tasks = []
-        for module_name, module in modules.items():
-            # Each module has a function with the same name as the file
-            func_name = module_name.split('.')[-1]
-            if hasattr(module, func_name):
-                func = getattr(module, func_name)
-                tasks.append(run_check(func, email, client, results))
-
-        # Run all checks concurrently
-        await asyncio.gather(*tasks, return_exceptions=True)
-
-    # Filter to only found accounts
-    for r in results:
-        if isinstance(r, dict) and r.get('exists') == True:
-            found.append({
-                "name": r.get('name', 'Unknown'),
-                "exists": True,
-                "emailRecovery": r.get('emailrecovery'),
-                "phoneNumber": r.get('phoneNumber'),
-                "url": get_site_url(r.get('name', ''))
-            })
+    if not await is_checkable(email):
+        return None
 
-    return found
+    client = get_client()
+    if sem is None:
+        sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    await prefetch_dns()
+
+    def collect(entry):
+        found.append(entry)
+        if on_found is not None:
+            on_found(entry)
+
+    # Create tasks for all checks; each hands its found accounts to collect
+    # as soon as it finishes
+    tasks = [
+        asyncio.ensure_future(run_check(func, email, client, sem, collect))
+        for _, func in _MODULES
+    ]
 
-async def run_check(func, email, client, results):
-    """Run a single check safely"""
+    # Run all checks concurrently; sites that miss the budget are cancelled
     try:
-        await func(email, client, results)
-    except Exception:
+        await asyncio.wait_for(
+            asyncio.gather(*tasks, return_exceptions=True),
+            timeout=timeout,
+        )
+    except asyncio.TimeoutError:
         pass
 
+    if _DEBUG:
+        for (name, _), task in zip(_MODULES, tasks):
+            if task.cancelled():
+                log_failure(name, email, 'cancelled (global timeout)')
+            elif task.exception() is not None:
+                e = task.exception()
+                log_failure(name, email, f'{type(e).__name__}: {e}')
+
+    return found
+
+def log_failure(module_name, email, reason):
+    """Report a module that failed or timed out on stderr (HOLEHE_DEBUG only)"""
+    sys.stderr.write(f'{module_name} [{email}]: {reason}\n')
+
+async def check_emails(emails):
+    """Check several emails in one fanout over the shared client and slots
+
+    Returns one found list (None when skipped) per email, in input order.
+    """
+    sem = asyncio.Semaphore(MAX_CONCURRENCY)
+    waves = math.ceil(len(emails) * len(_MODULES) / MAX_CONCURRENCY) or 1
+    return await asyncio.gather(*(
+        check_email(email, sem=sem, timeout=GLOBAL_TIMEOUT * waves)
+        for email in emails
+    ))
+
+async def run_check(func, email, client, sem, on_found):
+    """Run a single check and pass each found account to on_found
+
+    Accounts the module reported before failing are still passed on; the
+    exception then propagates so gather records it.
+    """
+    out = []
+    try:
+        async with sem:
+            await asyncio.wait_for(func(email, client, out), timeout=MODULE_TIMEOUT)
+    finally:
+        # holehe modules append one dict per site checked
+        for r in out:
+            if r.get('exists') is True:
+                on_found(to_found(r))
+
+# Every holehe module fills these keys; fetch them in one call
+_FOUND_FIELDS = operator.itemgetter('name', 'emailrecovery', 'phoneNumber')
+
+def to_found(r):
+    """Project a holehe result onto the found-account output shape"""
+    try:
+        name, email_recovery, phone_number = _FOUND_FIELDS(r)
+    except KeyError:
+        return {
+            "name": r.get('name', 'Unknown'),
+            "exists": True,
+            "emailRecovery": r.get('emailrecovery'),
+            "phoneNumber": r.get('phoneNumber'),
+            "url": get_site_url(r.get('name', ''))
+        }
+    return {
+        "name": name,
+        "exists": True,
+        "emailRecovery": email_recovery,
+        "phoneNumber": phone_number,
+        "url": get_site_url(name)
+    }
+
+# Homepages of known sites, keyed by lowercased holehe module name
+_SITE_URLS = {
+    'instagram': 'https://instagram.com',
+    'twitter': 'https://twitter.com',
+    'facebook': 'https://facebook.com',
+    'linkedin': 'https://linkedin.com',
+    'pinterest': 'https://pinterest.com',
+    'spotify': 'https://spotify.com',
+    'discord': 'https://discord.com',
+    'github': 'https://github.com',
+    'gitlab': 'https://gitlab.com',
+    'snapchat': 'https://snapchat.com',
+    'tiktok': 'https://tiktok.com',
+    'tumblr': 'https://tumblr.com',
+    'amazon': 'https://amazon.com',
+    'ebay': 'https://ebay.com',
+    'adobe': 'https://adobe.com',
+    'netflix': 'https://netflix.com',
+    'steam': 'https://steampowered.com',
+    'duolingo': 'https://duolingo.com',
+    'strava': 'https://strava.com',
+    'imgur': 'https://imgur.com',
+    'gravatar': 'https://gravatar.com',
+    'wordpress': 'https://wordpress.com',
+    'medium': 'https://medium.com',
+    'quora': 'https://quora.com',
+    'reddit': 'https://reddit.com',
+}
+
 def get_site_url(name):
     """Get URL for known sites"""
-    urls = {
-        'instagram': 'https://instagram.com',
-        'twitter': 'https://twitter.com',
-        'facebook': 'https://facebook.com',
-        'linkedin': 'https://linkedin.com',
-        'pinterest': 'https://pinterest.com',
-        'spotify': 'https://spotify.com',
-        'discord': 'https://discord.com',
-        'github': 'https://github.com',
-        'gitlab': 'https://gitlab.com',
-        'snapchat': 'https://snapchat.com',
-        'tiktok': 'https://tiktok.com',
-        'tumblr': 'https://tumblr.com',
-        'amazon': 'https://amazon.com',
-        'ebay': 'https://ebay.com',
-        'adobe': 'https://adobe.com',
-        'netflix': 'https://netflix.com',
-        'spotify': 'https://spotify.com',
-        'steam': 'https://steampowered.com',
-        'duolingo': 'https://duolingo.com',
-        'strava': 'https://strava.com',
-        'imgur': 'https://imgur.com',
-        'gravatar': 'https://gravatar.com',
-        'wordpress': 'https://wordpress.com',
-        'medium': 'https://medium.com',
-        'quora': 'https://quora.com',
-        'reddit': 'https://reddit.com',
-    }
-    return urls.get(name.lower(), f'https://{name.lower()}.com')
+    name = name.lower()
+    return _SITE_URLS.get(name, f'https://{name}.com')
+
+def make_response(email, found):
+    """Build the JSON response for one email; found is None when skipped"""
+    if found is None:
+        return {"email": email, "found": [], "count": 0, "skipped": "invalid"}
+    return {"email": email, "found": found, "count": len(found)}
+
+def dumps_line(obj):
+    """Serialize obj as one JSON line"""
+    if orjson is not None:
+        return orjson.dumps(obj) + b'\n'
+    return json.dumps(obj).encode() + b'\n'
+
+def emit_line(obj):
+    """Write one JSON line to stdout and flush it to the reader"""
+    sys.stdout.buffer.write(dumps_line(obj))
+    sys.stdout.buffer.flush()
+
+def run(coro):
+    """Run a coroutine on uvloop when installed, else the default loop"""
+    if uvloop is None:
+        return asyncio.run(coro)
+    if hasattr(uvloop, 'run'):
+        return uvloop.run(coro)
+    uvloop.install()
+    return asyncio.run(coro)
+
+async def run_single(email, on_found=None):
+    """Check one email and release the shared client"""
+    try:
+        return await check_email(email, on_found)
+    finally:
+        await close_client()
+
+async def run_batch(path):
+    """Check every email in a file, one JSON line per email"""
+    with open(path) as f:
+        emails = [line.strip() for line in f if line.strip()]
+    try:
+        for email, found in zip(emails, await check_emails(emails)):
+            emit_line(make_response(email, found))
+    finally:
+        await close_client()
+
+async def run_server():
+    """Worker mode: read one email per stdin line, write one JSON line each"""
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            email = line.strip()
+            if not email:
+                continue
+            try:
+                found = await check_email(email)
+                emit_line(make_response(email, found))
+            except Exception as e:
+                emit_line({"email": email, "error": str(e)})
+    finally:
+        await close_client()
+
+async def handle_connection(reader, writer):
+    """Answer each email line on a socket connection with one JSON line"""
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            email = line.decode(errors='replace').strip()
+            if not email:
+                continue
+            try:
+                response = make_response(email, await check_email(email))
+            except Exception as e:
+                response = {"email": email, "error": str(e)}
+            writer.write(dumps_line(response))
+            await writer.drain()
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+async def run_socket_server(path):
+    """Daemon mode: serve checks on a Unix socket, keeping the client,
+    module list and DNS cache warm between requests"""
+    if os.path.exists(path):
+        os.unlink(path)
+    server = await asyncio.start_unix_server(handle_connection, path)
+
+    # Shut down cleanly (closing the client, removing the socket) on SIGTERM
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        await close_client()
+        if os.path.exists(path):
+            os.unlink(path)
 
 if __name__ == '__main__':
     if len(sys.argv) < 2:
-        print(json.dumps({"error": "Usage: python3 holehe-check.py email@example.com"}))
+        emit_line({"error": "Usage: python3 holehe-check.py email@example.com"})
         sys.exit(1)
 
+    if sys.argv[1] == '--server':
+        run(run_server())
+        sys.exit(0)
+
+    if sys.argv[1] == '--emails-file':
+        if len(sys.argv) < 3:
+            emit_line({"error": "Usage: python3 holehe-check.py --emails-file emails.txt"})
+            sys.exit(1)
+        try:
+            run(run_batch(sys.argv[2]))
+        except Exception as e:
+            emit_line({"error": str(e)})
+            sys.exit(1)
+        sys.exit(0)
+
+    if sys.argv[1] == '--socket':
+        path = sys.argv[2] if len(sys.argv) > 2 else SOCKET_PATH
+        try:
+            run(run_socket_server(path))
+        except (KeyboardInterrupt, asyncio.CancelledError):
+            pass
+        sys.exit(0)
+
+    if sys.argv[1] == '--stream':
+        if len(sys.argv) < 3:
+            emit_line({"error": "Usage: python3 holehe-check.py --stream email@example.com"})
+            sys.exit(1)
+        try:
+            found = run(run_single(sys.argv[2], emit_line))
+            summary = {"email": sys.argv[2], "count": len(found or []), "done": True}
+            if found is None:
+                summary["skipped"] = "invalid"
+            emit_line(summary)
+        except Exception as e:
+            emit_line({"error": str(e), "done": True})
+            sys.exit(1)
+        sys.exit(0)
+
     email = sys.argv[1]
 
     try:
-        found = asyncio.run(check_email(email))
-        print(json.dumps({
-            "email": email,
-            "found": found,
-            "count": len(found)
-        }))
+        found = run(run_single(email))
+        emit_line(make_response(email, found))
     except Exception as e:
-        print(json.dumps({"error": str(e)}))
+        emit_line({"error": str(e)})
         sys.exit(1)
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Holehe Registry Generator - Write a static list of holehe check functions
+Usage: python3 holehe-registry-gen.py
+Output: holehe_registry.py next to this script, imported by holehe-check.py
+
+Re-run after installing or upgrading holehe.
+"""
+
+import os
+import re
+import sys
+import inspect
+
+try:
+    from holehe import core
+except ImportError:
+    print("holehe not installed. Run: pip3 install holehe")
+    sys.exit(1)
+
+_HOST_RE = re.compile(r'https?://([A-Za-z0-9.-]+)')
+
+OUTPUT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'holehe_registry.py')
+
+def main():
+    modules = core.import_submodules('holehe.modules')
+
+    entries = []
+    hosts = set()
+    for module_name, module in sorted(modules.items()):
+        # Each module has a function with the same name as the file
+        func_name = module_name.split('.')[-1]
+        if hasattr(module, func_name):
+            entries.append((module_name, func_name))
+            # Hosts the module talks to, for DNS prefetching
+            hosts.update(h.lower() for h in _HOST_RE.findall(inspect.getsource(module)))
+
+    lines = [
+        '"""Generated by holehe-registry-gen.py - do not edit"""',
+        '',
+    ]
+    for module_name, func_name in entries:
+        lines.append(f'from {module_name} import {func_name} as _{func_name}')
+    lines += ['', 'GEN_MODULES = [']
+    for _, func_name in entries:
+        lines.append(f"    ('{func_name}', _{func_name}),")
+    lines += [']', '', 'GEN_HOSTS = [']
+    for host in sorted(hosts):
+        lines.append(f"    '{host}',")
+    lines += [']', '']
+
+    with open(OUTPUT_PATH, 'w') as f:
+        f.write('\n'.join(lines))
+
+    print(f"Wrote {len(entries)} modules and {len(hosts)} hosts to {OUTPUT_PATH}")
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,18 @@
 /**
  * Holehe Integration - Check email registration on 120+ sites
- * Uses Python holehe library via subprocess
+ * Uses Python holehe library via subprocess, or via the long-running
+ * `holehe-check.py --socket` daemon when HOLEHE_SOCKET is set
  */
 
 import { exec } from 'child_process';
+import net from 'net';
 import { promisify } from 'util';
 import path from 'path';
 
 const execAsync = promisify(exec);
 
+const HOLEHE_TIMEOUT_MS = 120000; // 2 minute timeout
+
 export interface HoleheResult {
   name: string;
   exists: boolean;
@@ -21,23 +25,75 @@ export interface HoleheResponse {
   email: string;
   found: HoleheResult[];
   count: number;
+  // Set when the email was rejected before any site was checked
+  skipped?: 'invalid';
   error?: string;
 }
 
+/**
+ * Send one email to the holehe daemon and read back its JSON line
+ */
+function checkViaSocket(socketPath: string, email: string): Promise<HoleheResponse> {
+  return new Promise((resolve, reject) => {
+    const socket = net.createConnection(socketPath);
+    let buffer = '';
+
+    socket.setEncoding('utf8');
+    socket.setTimeout(HOLEHE_TIMEOUT_MS);
+    // One request per line, so the email itself must not contain a newline
+    socket.on('connect', () => socket.write(`${email.replace(/[\r\n]/g, '')}\n`));
+    socket.on('data', (chunk: string) => {
+      buffer += chunk;
+      const newline = buffer.indexOf('\n');
+      if (newline === -1) return;
+      socket.end();
+      try {
+        resolve(JSON.parse(buffer.slice(0, newline)));
+      } catch (error) {
+        reject(error);
+      }
+    });
+    socket.on('timeout', () => socket.destroy(new Error('Holehe socket timeout')));
+    socket.on('error', reject);
+    // The daemon may close without answering (e.g. on SIGTERM); a no-op once resolved
+    socket.on('close', () => reject(new Error('Holehe daemon closed the connection without a response')));
+  });
+}
+
+/**
+ * Run holehe-check.py as a one-off subprocess
+ */
+async function checkViaSubprocess(email: string): Promise<HoleheResponse> {
+  const scriptPath = path.join(process.cwd(), 'scripts', 'holehe-check.py');
+
+  const { stdout } = await execAsync(
+    `python3 "${scriptPath}" "${email}"`,
+    { timeout: HOLEHE_TIMEOUT_MS }
+  );
+
+  // Parse JSON output
+  return JSON.parse(stdout.trim());
+}
+
 /**
  * Check email against 120+ websites using Holehe
  */
 export async function checkEmailWithHolehe(email: string): Promise<HoleheResult[]> {
   try {
-    const scriptPath = path.join(process.cwd(), 'scripts', 'holehe-check.py');
+    let result: HoleheResponse | null = null;
 
-    const { stdout, stderr } = await execAsync(
-      `python3 "${scriptPath}" "${email}"`,
-      { timeout: 120000 } // 2 minute timeout
-    );
+    const socketPath = process.env.HOLEHE_SOCKET;
+    if (socketPath) {
+      try {
+        result = await checkViaSocket(socketPath, email);
+      } catch (error) {
+        console.error('Holehe daemon unavailable, falling back to subprocess:', error);
+      }
+    }
 
-    // Parse JSON output
-    const result: HoleheResponse = JSON.parse(stdout.trim());
+    if (!result) {
+      result = await checkViaSubprocess(email);
+    }
 
     if (result.error) {
       console.error('Holehe error:', result.error);
@@ -9,8 +9,22 @@ import sys
 import os
 import re
 import time
+import random
+import secrets
+import asyncio
+import atexit
+import queue
+import threading
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import islice
+from datetime import date, datetime, timedelta, timezone
+
+from supabase_upsert import upsert_rows
 
 # Add parent venv to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'venv', 'lib', 'python3.11', 'site-packages'))
@@ -23,12 +37,26 @@ except ImportError:
     SCRAPLING_AVAILABLE = False
     print("[Warning] Scrapling not available, using requests only", file=sys.stderr)
 
+# Try to import a brotli decoder (used by urllib3 and aiohttp for br bodies)
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+        print("[Warning] brotli not available, requesting gzip pages only", file=sys.stderr)
+
 # Anti-bot headers for requests
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
     'Accept-Language': 'en-US,en;q=0.9,fr;q=0.8',
-    'Accept-Encoding': 'gzip, deflate, br',
+    # Only advertise br when it can be decoded; otherwise a brotli body
+    # would reach the page patterns still compressed
+    'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
     'Connection': 'keep-alive',
     'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
     'Sec-Ch-Ua-Mobile': '?0',
@@ -41,6 +69,16 @@ HEADERS = {
     'Cache-Control': 'max-age=0',
 }
 
+# Shared requests session: keeps connections to airbnb.com alive across
+# fetches and retries throttled responses with backoff
+_SESSION = requests.Session()
+_SESSION.headers.update(HEADERS)
+_SESSION.mount('https://', HTTPAdapter(
+    pool_connections=20,
+    pool_maxsize=20,
+    max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 503]),
+))
+
 # Try to import playwright
 try:
     from playwright.sync_api import sync_playwright
@@ -49,77 +87,351 @@ except ImportError:
     PLAYWRIGHT_AVAILABLE = False
     print("[Warning] Playwright not available", file=sys.stderr)
 
+# Try to import aiohttp for concurrent page fetches
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    print("[Warning] aiohttp not available, fetching pages sequentially", file=sys.stderr)
+
+# Try to import orjson for faster parsing of the embedded page JSON and
+# serialization of the scraped listings
+try:
+    import orjson
+    loads_json = orjson.loads
+
+    def dumps_json_bytes(obj, pretty: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+except ImportError:
+    loads_json = json.loads
+
+    def dumps_json_bytes(obj, pretty: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False).encode()
+
+
+def dumps_json(obj, pretty: bool = False) -> str:
+    return dumps_json_bytes(obj, pretty).decode()
+
+# Try to import selectolax to locate embedded page scripts through the DOM
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+    print("[Warning] selectolax not available, locating page scripts with regex", file=sys.stderr)
+
+# Cap on listings taken from bare numeric room IDs per search page
+MAX_ROOM_ID_LISTINGS = 500
+
+# Max Airbnb pages fetched at once (aiohttp tasks or detail worker threads)
+MAX_CONCURRENT_FETCHES = 5
+
+# Page patterns are bytes patterns: pages are scanned as fetched, without
+# decoding, and only the captured groups are decoded
+
+# Block-page marker checked on every fetch (fetchers)
+_RE_CAPTCHA = re.compile(rb'captcha', re.IGNORECASE)
+
+# Search page patterns (extract_listings_from_html)
+_RE_PRICE = re.compile(rb'\$(\d+)')
+_RE_PRELOAD = re.compile(rb'Hosting-(\d{10,20})/original/([a-f0-9-]+\.jpe?g)')
+_RE_MISO = re.compile(rb'miso/Hosting-(\d{10,20})/original/([a-f0-9-]+\.jpe?g)')
+_RE_ROOM_ID = re.compile(rb'"(\d{15,20})"')
+
+# Listing page patterns (parse_listing_details)
+_RE_JSONLD = re.compile(rb'application/ld\+json">(\{[^<]+\})')
+_RE_DEFERRED_STATE = re.compile(rb'<script id="data-deferred-state[^"]*"[^>]*>(.*?)</script>', re.S)
+# Keys read from the parsed deferred state, mapped to the scan_detail_fields
+# name and the value types accepted for it
+_STATE_FIELDS = {
+    'roomType': ('roomType', str),
+    'bedrooms': ('bedrooms', (int, float)),
+    'beds': ('beds', (int, float)),
+    'bathrooms': ('bathrooms', (int, float)),
+    'personCapacity': ('personCapacity', (int, float)),
+    'lat': ('lat', float),
+    'latitude': ('lat', float),
+    'lng': ('lng', float),
+    'longitude': ('lng', float),
+    'city': ('city', str),
+    'addressLocality': ('addressLocality', str),
+    'hostId': ('hostId', (str, int)),
+    'hostDisplayName': ('hostDisplayName', str),
+}
+# Embedded JSON keys, matched together in a single pass; the group name is
+# the key that matched
+_RE_DETAIL_FIELDS = re.compile(
+    rb'"roomType":"(?P<roomType>[^"]+)"'
+    rb'|"bedrooms":(?P<bedrooms>\d+)'
+    rb'|"beds":(?P<beds>\d+)'
+    rb'|"bathrooms":(?P<bathrooms>\d+)'
+    rb'|"personCapacity":(?P<personCapacity>\d+)'
+    rb'|"lat(?:itude)?":(?P<lat>-?\d+\.\d+)'
+    rb'|"(?:lng|longitude)":(?P<lng>-?\d+\.\d+)'
+    rb'|"city":"(?P<city>[^"]+)"'
+    rb'|"addressLocality":"(?P<addressLocality>[^"]+)"'
+    rb'|"hostId":"?(?P<hostId>\d+)"?'
+    rb'|"hostDisplayName":"(?P<hostDisplayName>[^"]+)"'
+)
+_DETAIL_FIELD_COUNT = len(_RE_DETAIL_FIELDS.groupindex)
+
+# Visible-text fallbacks for keys missing from the embedded JSON
+_RE_BEDROOMS_TEXT = re.compile(rb'(\d+)\s*bedroom', re.IGNORECASE)
+_RE_BEDS_TEXT = re.compile(rb'(\d+)\s*bed[^r]', re.IGNORECASE)
+_RE_BATHROOMS_TEXT = re.compile(rb'(\d+)\s*bath', re.IGNORECASE)
+_RE_GUESTS_TEXT = re.compile(rb'(\d+)\s*guest', re.IGNORECASE)
+_RE_HOSTED_BY = re.compile(rb'Hosted by ([^<"]+)')
+# Price patterns in priority order, scanned together in one pass. Each
+# alternative sits in a lookahead so overlapping candidates are all seen;
+# the matched group number is the pattern's priority.
+_RE_DETAIL_PRICE = re.compile(
+    rb'(?=\$(\d+)\s*/?\s*night'
+    rb'|(\d+)\s*\$\s*/?\s*night'
+    rb'|"priceString":"[^"]*\$(\d+)'
+    rb'|"price":(\d+)'
+    rb'|"amount":(\d+).*?"currency":"USD")',
+    re.IGNORECASE,
+)
+_RE_VISIBLE_PRICE = re.compile(rb'\$(\d{2,4})\s*(?:per\s*)?night', re.IGNORECASE)
+_RE_AMENITY = re.compile(rb'"title":"([^"]+)","icon":"[A-Z_]+"')
+# UI labels caught by the amenity pattern (substring match, like the old word lists)
+_RE_AMENITY_SKIP = re.compile(r'report|show|more|less|view|close|back|next', re.IGNORECASE)
+
+# Search card patterns (parse_airbnb_card)
+_RE_CARD_ROOM_ID = re.compile(r'/rooms/(\d+)')
+_RE_CARD_LOCATION = re.compile(r'in\s+(.+)$')
+# Card price patterns in priority order, as lookahead alternatives so one
+# pass sees every candidate; the matched group number is the priority
+_RE_CARD_PRICE = re.compile(
+    r'(?=\$\s*([\d,]+)'  # $123 or $ 123
+    r'|([\d,]+)\s*\$'  # 123$ or 123 $
+    r'|([\d,]+)\s*€'  # 123€
+    r'|([\d\s,]+)\s*(?:XOF|CFA|FCFA)'  # XOF prices
+    r'|([\d,]+)\s*/\s*night'  # 123/night
+    r'|([\d,]+)\s*per night)',  # 123 per night
+    re.IGNORECASE,
+)
+_CARD_PRICE_SELECTORS = (
+    '[data-testid="price-availability-row"]',
+    'span._1y74zjx',
+    'span[aria-hidden="true"]._1ks8cgb',  # Price span
+    '._1jo4hgw',  # Price container
+    'div._tt122m',  # Another price pattern
+)
+_RE_CARD_TEXT_PRICE = re.compile(r'\$(\d+)')
+_RE_CARD_RATING = re.compile(r'(\d+[.,]\d+)')
+_RE_RATING_TEXT = re.compile(r'^\d+\.\d{1,2}$')
+_RE_PROPERTY_TYPE = re.compile(r'^(Apartment|Room|House|Villa|Condo|Place|Entire|Private|Shared)', re.IGNORECASE)
+
+# UI labels dropped by normalize_amenities
+_RE_NORMALIZE_SKIP = re.compile(r'show|more|less|view|close|automatically translated', re.IGNORECASE)
+
+
+class BrowserPool:
+    """One headless Chromium shared by every Playwright fetch
+
+    Sync Playwright is bound to the thread that started it, so the browser
+    is launched lazily and driven from a single worker thread; callers from
+    any thread (including run_in_executor workers) queue a fetch and block
+    on its result. Each fetch only opens and closes a page.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _worker(self):
+        """Own the Playwright instance and run queued fetches until shutdown"""
+        playwright = browser = context = None
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            future, url, wait_time = job
+            try:
+                if context is None:
+                    if playwright is None:
+                        playwright = sync_playwright().start()
+                    if browser is None:
+                        browser = playwright.chromium.launch(headless=True)
+                    context = browser.new_context(
+                        user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                        viewport={'width': 1920, 'height': 1080},
+                        locale='en-US',
+                    )
+
+                page = context.new_page()
+                try:
+                    # Navigate and wait for content
+                    page.goto(url, wait_until='networkidle', timeout=30000)
+                    page.wait_for_timeout(wait_time * 1000)  # Additional wait for JS
+                    future.set_result(page.content())
+                finally:
+                    page.close()
+            except Exception as e:
+                future.set_exception(e)
+
+        if browser is not None:
+            browser.close()
+        if playwright is not None:
+            playwright.stop()
+
+    def fetch(self, url: str, wait_time: int) -> str:
+        """Load url in a new page of the shared browser and return its HTML"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='playwright', daemon=True)
+                self._thread.start()
+
+        future = Future()
+        self._jobs.put((future, url, wait_time))
+        return future.result()
+
+    def shutdown(self):
+        """Close the browser and stop the worker thread, if it was started"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+browser_pool = BrowserPool()
+atexit.register(browser_pool.shutdown)
+
+
+def is_blocked_page(html: bytes) -> bool:
+    """True for captcha interstitials and truncated pages"""
+    return len(html) < 5000 or _RE_CAPTCHA.search(html) is not None
+
 
 def fetch_with_playwright(url: str, wait_time: int = 5) -> tuple:
-    """Fetch URL using Playwright headless browser"""
+    """Fetch URL using the shared Playwright headless browser"""
     if not PLAYWRIGHT_AVAILABLE:
         return None, False
 
     try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent='Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                viewport={'width': 1920, 'height': 1080},
-                locale='en-US',
-            )
-            page = context.new_page()
-
-            # Navigate and wait for content
-            page.goto(url, wait_until='networkidle', timeout=30000)
-            page.wait_for_timeout(wait_time * 1000)  # Additional wait for JS
+        html = browser_pool.fetch(url, wait_time).encode()
 
-            html = page.content()
-            browser.close()
-
-            if 'captcha' in html.lower() or len(html) < 5000:
-                return None, False
+        if is_blocked_page(html):
+            return None, False
 
-            return html, True
+        return html, True
     except Exception as e:
         print(f"[Airbnb] Playwright error: {e}", file=sys.stderr)
         return None, False
 
 def fetch_with_requests(url: str, session: requests.Session = None) -> tuple:
-    """Fetch URL using requests with anti-bot headers"""
+    """Fetch URL using requests with anti-bot headers (on the shared session by default)
+
+    Returns the raw body bytes, like the other fetchers, for the bytes page patterns.
+    """
     if session is None:
-        session = requests.Session()
+        session = _SESSION
 
     try:
-        response = session.get(url, headers=HEADERS, timeout=30)
-        if response.status_code == 200 and 'captcha' not in response.text.lower():
-            return response.text, True
+        response = session.get(url, timeout=30)
+        html = response.content
+        if response.status_code == 200 and not is_blocked_page(html):
+            return html, True
         return None, False
     except Exception as e:
         print(f"[Airbnb] Request error: {e}", file=sys.stderr)
         return None, False
 
 
+async def fetch_async(session, url: str) -> tuple:
+    """Fetch URL using aiohttp with anti-bot headers"""
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            html = await response.read()
+            if response.status == 200 and not is_blocked_page(html):
+                return html, True
+            return None, False
+    except Exception as e:
+        print(f"[Airbnb] Request error: {e}", file=sys.stderr)
+        return None, False
+
+
+async def fetch_page_async(session, sem, url: str, wait_time: int) -> tuple:
+    """Fetch URL with aiohttp, falling back to Playwright in a worker thread
+
+    The semaphore caps concurrent requests; each slot is held for a short
+    random delay after the fetch to keep the request rate polite.
+    """
+    async with sem:
+        html, success = await fetch_async(session, url)
+
+        if not html or not success:
+            print(f"[Airbnb] aiohttp failed, trying Playwright...", file=sys.stderr)
+            loop = asyncio.get_running_loop()
+            html, success = await loop.run_in_executor(None, fetch_with_playwright, url, wait_time)
+
+        await asyncio.sleep(random.uniform(1.0, 2.0))
+
+    return html, success
+
+
+async def fetch_all_async(urls: list, wait_time: int) -> list:
+    """Fetch several URLs concurrently, returning (html, success) in order"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        return await asyncio.gather(*(fetch_page_async(session, sem, url, wait_time) for url in urls))
+
+
+def fetch_search_pages(urls: list):
+    """Yield (html, success) for each search page, one at a time
+
+    Tries requests first (faster), then falls back to Playwright, with an
+    increasing delay before each following page.
+    """
+    for page_num, url in enumerate(urls, 1):
+        html_content, success = fetch_with_requests(url)
+
+        if not html_content or not success:
+            print(f"[Airbnb] Requests failed, trying Playwright...", file=sys.stderr)
+            html_content, success = fetch_with_playwright(url, wait_time=5)
+
+        yield html_content, success
+
+        # Rate limiting between pages
+        if page_num < len(urls):
+            delay = 3 + (page_num * 0.5)  # Increasing delay
+            print(f"[Airbnb] Waiting {delay}s before next page...", file=sys.stderr)
+            time.sleep(delay)
+
+
 def scrape_airbnb_search(city: str = "Dakar", country: str = "Senegal", max_pages: int = 5):
     """Scrape Airbnb search results for a city"""
 
     all_listings = []
-    session = requests.Session()
+    scraped_at = datetime.now().isoformat()  # One timestamp for the whole scrape
 
-    for page_num in range(1, max_pages + 1):
-        # Airbnb search URL with pagination
-        offset = (page_num - 1) * 18  # Airbnb uses 18 items per page
-        if offset == 0:
-            base_url = f"https://www.airbnb.com/s/{city}--{country}/homes"
-        else:
-            base_url = f"https://www.airbnb.com/s/{city}--{country}/homes?items_offset={offset}"
+    # Airbnb search URLs with pagination (18 items per page)
+    urls = [f"https://www.airbnb.com/s/{city}--{country}/homes"]
+    urls += [
+        f"https://www.airbnb.com/s/{city}--{country}/homes?items_offset={(page_num - 1) * 18}"
+        for page_num in range(2, max_pages + 1)
+    ]
+
+    if AIOHTTP_AVAILABLE:
+        # Fetch every page at once; pagination still stops at the first empty page
+        print(f"\n[Airbnb] Fetching {len(urls)} pages concurrently - {city}, {country}...", file=sys.stderr)
+        pages = asyncio.run(fetch_all_async(urls, wait_time=5))
+    else:
+        pages = fetch_search_pages(urls)
 
+    for page_num, (html_content, success) in enumerate(pages, 1):
         print(f"\n[Airbnb] Page {page_num}/{max_pages} - {city}, {country}...", file=sys.stderr)
-        print(f"[Airbnb] URL: {base_url}", file=sys.stderr)
+        print(f"[Airbnb] URL: {urls[page_num - 1]}", file=sys.stderr)
 
         try:
-            # Try requests first (faster), then fall back to Playwright
-            html_content, success = fetch_with_requests(base_url, session)
-
-            if not html_content or not success:
-                print(f"[Airbnb] Requests failed, trying Playwright...", file=sys.stderr)
-                html_content, success = fetch_with_playwright(base_url, wait_time=5)
-
             if not html_content or not success:
                 print(f"[Airbnb] All methods failed on page {page_num}, skipping...", file=sys.stderr)
                 continue
@@ -128,12 +440,12 @@ def scrape_airbnb_search(city: str = "Dakar", country: str = "Senegal", max_page
 
             # Debug: save full HTML
             if page_num == 1:
-                with open('/tmp/airbnb_debug.html', 'w') as f:
+                with open('/tmp/airbnb_debug.html', 'wb') as f:
                     f.write(html_content)
                 print("[Airbnb] Debug HTML saved to /tmp/airbnb_debug.html", file=sys.stderr)
 
             # Extract listings from HTML content
-            page_listings = extract_listings_from_html(html_content)
+            page_listings = extract_listings_from_html(html_content, scraped_at)
 
             print(f"[Airbnb] Extracted {len(page_listings)} listings from page {page_num}", file=sys.stderr)
 
@@ -143,12 +455,6 @@ def scrape_airbnb_search(city: str = "Dakar", country: str = "Senegal", max_page
 
             all_listings.extend(page_listings)
 
-            # Rate limiting between pages
-            if page_num < max_pages:
-                delay = 3 + (page_num * 0.5)  # Increasing delay
-                print(f"[Airbnb] Waiting {delay}s before next page...", file=sys.stderr)
-                time.sleep(delay)
-
         except Exception as e:
             print(f"[Airbnb] Scrape error on page {page_num}: {e}", file=sys.stderr)
             import traceback
@@ -159,102 +465,129 @@ def scrape_airbnb_search(city: str = "Dakar", country: str = "Senegal", max_page
     return all_listings
 
 
-def extract_listings_from_html(html: str) -> list:
+@dataclass(slots=True)
+class Listing:
+    """A search-result listing; converted to a dict at the output/save boundary"""
+    platform: str = 'airbnb'
+    platform_id: str = ''
+    url: str = ''
+    photos: list = field(default_factory=list)
+    scraped_at: str = ''
+    city: str = 'Dakar'
+    price: int = None
+    currency: str = None
+
+    def to_dict(self) -> dict:
+        """Plain dict of the listing, leaving out unset fields"""
+        return {name: value for name in self.__slots__ if (value := getattr(self, name)) is not None}
+
+
+def listing_dicts(listings: list) -> list:
+    """Listings as plain dicts, converting any Listing objects"""
+    return [l.to_dict() if isinstance(l, Listing) else l for l in listings]
+
+
+def extract_listings_from_html(html: bytes, scraped_at: str = None) -> list:
     """Extract listing data from embedded JSON and preload links in HTML"""
     listings = []
     seen_ids = set()
+    seen_ids_add = seen_ids.add
+    if scraped_at is None:
+        scraped_at = datetime.now().isoformat()
 
-    # First, try to extract prices from the HTML
-    # Prices appear as $XXX in the search results
-    all_prices = re.findall(r'\$(\d+)', html)
+    # Prices appear as $XXX in the search results, in the same order as the
+    # listings; pulled lazily, skipping small numbers (likely ratings like 4.5)
+    prices = (price for price in (int(m.group(1)) for m in _RE_PRICE.finditer(html)) if price >= 10)
 
     # Method 1: Extract listing IDs from preload image links (in order)
     # Pattern: Hosting-{listing_id}/original/
-    preload_pattern = r'Hosting-(\d{10,20})/original/([a-f0-9-]+\.jpe?g)'
-    preload_matches = re.findall(preload_pattern, html)
+    preload_matches = _RE_PRELOAD.findall(html)
 
-    price_index = 0
     for listing_id, image_uuid in preload_matches:
+        listing_id = listing_id.decode()
         if listing_id not in seen_ids:
-            seen_ids.add(listing_id)
-            image_url = f"https://a0.muscache.com/im/pictures/hosting/Hosting-{listing_id}/original/{image_uuid}?im_w=720"
-            listing = {
-                'platform': 'airbnb',
-                'platform_id': listing_id,
-                'url': f"https://www.airbnb.com/rooms/{listing_id}",
-                'photos': [image_url],
-                'scraped_at': datetime.now().isoformat(),
-                'city': 'Dakar',
-            }
-
-            # Try to associate price (prices appear in order with listings)
-            # Skip small numbers (likely ratings like 4.5)
-            while price_index < len(all_prices):
-                try:
-                    price_val = int(all_prices[price_index])
-                    price_index += 1
-                    if price_val >= 10:  # Reasonable minimum price
-                        listing['price'] = price_val
-                        listing['currency'] = 'USD'
-                        break
-                except:
-                    price_index += 1
+            seen_ids_add(listing_id)
+            image_url = f"https://a0.muscache.com/im/pictures/hosting/Hosting-{listing_id}/original/{image_uuid.decode()}?im_w=720"
+            listing = Listing(
+                platform_id=listing_id,
+                url=f"https://www.airbnb.com/rooms/{listing_id}",
+                photos=[image_url],
+                scraped_at=scraped_at,
+            )
+
+            # Associate the next price (prices appear in order with listings)
+            price = next(prices, None)
+            if price is not None:
+                listing.price = price
+                listing.currency = 'USD'
 
             listings.append(listing)
 
     # Method 2: Also extract from miso hosting pattern
-    miso_pattern = r'miso/Hosting-(\d{10,20})/original/([a-f0-9-]+\.jpe?g)'
-    miso_matches = re.findall(miso_pattern, html)
+    miso_matches = _RE_MISO.findall(html)
 
     for listing_id, image_uuid in miso_matches:
+        listing_id = listing_id.decode()
         if listing_id not in seen_ids:
-            seen_ids.add(listing_id)
-            image_url = f"https://a0.muscache.com/im/pictures/miso/Hosting-{listing_id}/original/{image_uuid}?im_w=720"
-            listing = {
-                'platform': 'airbnb',
-                'platform_id': listing_id,
-                'url': f"https://www.airbnb.com/rooms/{listing_id}",
-                'photos': [image_url],
-                'scraped_at': datetime.now().isoformat(),
-                'city': 'Dakar',
-            }
-
-            while price_index < len(all_prices):
-                try:
-                    price_val = int(all_prices[price_index])
-                    price_index += 1
-                    if price_val >= 10:
-                        listing['price'] = price_val
-                        listing['currency'] = 'USD'
-                        break
-                except:
-                    price_index += 1
-
-            listings.append(listing)
+            seen_ids_add(listing_id)
+            image_url = f"https://a0.muscache.com/im/pictures/miso/Hosting-{listing_id}/original/{image_uuid.decode()}?im_w=720"
+            listing = Listing(
+                platform_id=listing_id,
+                url=f"https://www.airbnb.com/rooms/{listing_id}",
+                photos=[image_url],
+                scraped_at=scraped_at,
+            )
 
-    # Method 3: Extract any remaining long numeric IDs (room IDs)
-    room_id_pattern = r'"(\d{15,20})"'
-    room_matches = re.findall(room_id_pattern, html)
+            price = next(prices, None)
+            if price is not None:
+                listing.price = price
+                listing.currency = 'USD'
 
-    for listing_id in room_matches:
-        if listing_id not in seen_ids:
-            seen_ids.add(listing_id)
-            listing = {
-                'platform': 'airbnb',
-                'platform_id': listing_id,
-                'url': f"https://www.airbnb.com/rooms/{listing_id}",
-                'photos': [],
-                'scraped_at': datetime.now().isoformat(),
-                'city': 'Dakar',
-            }
             listings.append(listing)
 
+    # Method 3: Extract any remaining long numeric IDs (room IDs). The pattern
+    # also hits script and impression IDs, so matches are streamed and the
+    # number of new listings is capped
+    room_ids = (m.group(1).decode() for m in _RE_ROOM_ID.finditer(html))
+    new_room_ids = (listing_id for listing_id in room_ids if listing_id not in seen_ids)
+
+    for listing_id in islice(new_room_ids, MAX_ROOM_ID_LISTINGS):
+        seen_ids_add(listing_id)
+        listing = Listing(
+            platform_id=listing_id,
+            url=f"https://www.airbnb.com/rooms/{listing_id}",
+            scraped_at=scraped_at,
+        )
+        listings.append(listing)
+
     # Log price extraction stats
-    with_price = sum(1 for l in listings if l.get('price'))
+    with_price = sum(1 for l in listings if l.price)
     print(f"[Airbnb] Extracted {len(listings)} listings ({with_price} with prices)", file=sys.stderr)
     return listings
 
 
+@lru_cache(maxsize=1)
+def default_stay_dates(today: date) -> tuple:
+    """Default (check_in, check_out) for a given day: a stay 7-12 days out"""
+    check_in = (today + timedelta(days=7)).strftime('%Y-%m-%d')
+    check_out = (today + timedelta(days=12)).strftime('%Y-%m-%d')
+    return check_in, check_out
+
+
+def build_listing_url(listing_id: str, check_in: str = None, check_out: str = None) -> str:
+    """Build a listing page URL with stay dates (needed for price)"""
+
+    # Use dates if provided, else the default window (needed for price)
+    if not (check_in and check_out):
+        check_in, check_out = default_stay_dates(date.today())
+    url = f"https://www.airbnb.com/rooms/{listing_id}?check_in={check_in}&check_out={check_out}&adults=1"
+
+    # Add source_impression_id for more natural request
+    impression_id = f"p3_{random.randrange(10**10):010d}_{secrets.token_hex(8)}"
+    url += f"&source_impression_id={impression_id}"
+    return url
+
+
 def scrape_listing_details(listing_id: str, check_in: str = None, check_out: str = None, session: requests.Session = None) -> dict:
     """Scrape full details from an individual Airbnb listing page
 
@@ -262,40 +595,138 @@ def scrape_listing_details(listing_id: str, check_in: str = None, check_out: str
         listing_id: The Airbnb listing ID
         check_in: Check-in date (YYYY-MM-DD) for price extraction
         check_out: Check-out date (YYYY-MM-DD) for price extraction
-        session: Optional requests session for connection reuse
+        session: Optional requests session (defaults to the shared one)
     """
+    url = build_listing_url(listing_id, check_in, check_out)
 
-    # Build URL with dates if provided (needed for price)
-    if check_in and check_out:
-        url = f"https://www.airbnb.com/rooms/{listing_id}?check_in={check_in}&check_out={check_out}&adults=1"
-    else:
-        # Default: use dates 7 days from now for price
-        from datetime import timedelta
-        today = datetime.now()
-        check_in = (today + timedelta(days=7)).strftime('%Y-%m-%d')
-        check_out = (today + timedelta(days=12)).strftime('%Y-%m-%d')
-        url = f"https://www.airbnb.com/rooms/{listing_id}?check_in={check_in}&check_out={check_out}&adults=1"
+    print(f"[Airbnb] Fetching details for {listing_id}...", file=sys.stderr)
 
-    # Add source_impression_id for more natural request
-    import random
-    import string
-    impression_id = 'p3_' + ''.join(random.choices(string.digits, k=10)) + '_' + ''.join(random.choices(string.ascii_letters + string.digits, k=16))
-    url += f"&source_impression_id={impression_id}"
+    # Try requests first, then Playwright
+    html, success = fetch_with_requests(url, session)
+
+    if not html or not success:
+        print(f"[Airbnb] Requests failed for details, trying Playwright...", file=sys.stderr)
+        html, success = fetch_with_playwright(url, wait_time=3)
+
+    if not html or not success:
+        print(f"[Airbnb] Failed to fetch details for {listing_id}", file=sys.stderr)
+        return None
+
+    return parse_listing_details(listing_id, html)
+
+
+def scrape_listing_details_worker(listing_id: str) -> dict:
+    """scrape_listing_details for a worker thread, holding it for a short
+    random delay afterwards to keep the request rate polite"""
+    details = scrape_listing_details(listing_id)
+    time.sleep(random.uniform(1.0, 2.0))
+    return details
+
+
+async def scrape_listing_details_async(session, sem, listing_id: str) -> dict:
+    """Async variant of scrape_listing_details sharing an aiohttp session"""
+    url = build_listing_url(listing_id)
 
     print(f"[Airbnb] Fetching details for {listing_id}...", file=sys.stderr)
 
+    html, success = await fetch_page_async(session, sem, url, wait_time=3)
+    if not html or not success:
+        print(f"[Airbnb] Failed to fetch details for {listing_id}", file=sys.stderr)
+        return None
+
+    return parse_listing_details(listing_id, html)
+
+
+async def scrape_details_async(listing_ids: list) -> list:
+    """Fetch and parse several listing pages concurrently, in input order"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    connector = aiohttp.TCPConnector(limit=20, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        return await asyncio.gather(*(
+            scrape_listing_details_async(session, sem, listing_id) for listing_id in listing_ids
+        ))
+
+
+def collect_state_fields(node, fields: dict) -> None:
+    """Collect the first value of each detail key from a parsed JSON tree"""
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, (dict, list)):
+                collect_state_fields(value, fields)
+                continue
+            field = _STATE_FIELDS.get(key)
+            if field and field[0] not in fields and isinstance(value, field[1]) and not isinstance(value, bool):
+                # Like the regex fallback: no empty strings, numeric host ids only
+                if value == '' or (key == 'hostId' and not (str(value).isascii() and str(value).isdigit())):
+                    continue
+                fields[field[0]] = value
+    elif isinstance(node, list):
+        for item in node:
+            collect_state_fields(item, fields)
+
+
+def extract_page_scripts(html: bytes) -> tuple:
+    """Return the JSON-LD and deferred-state script bodies (None if absent)"""
+    jsonld = state = None
+
+    # One DOM build serves both lookups; regex only for what it misses
+    if SELECTOLAX_AVAILABLE:
+        tree = LexborHTMLParser(html)
+        node = tree.css_first('script[type="application/ld+json"]')
+        if node:
+            jsonld = node.text()
+        node = tree.css_first('script[id^="data-deferred-state"]')
+        if node:
+            state = node.text()
+
+    if jsonld is None:
+        jsonld_match = _RE_JSONLD.search(html)
+        if jsonld_match:
+            jsonld = jsonld_match.group(1)
+    if state is None:
+        state_match = _RE_DEFERRED_STATE.search(html)
+        if state_match:
+            state = state_match.group(1)
+
+    return jsonld, state
+
+
+def read_deferred_state(state) -> dict:
+    """Read detail fields from the data-deferred-state JSON blob (str or bytes)"""
+    fields = {}
     try:
-        # Try requests first, then Playwright
-        html, success = fetch_with_requests(url, session)
+        collect_state_fields(loads_json(state), fields)
+    except ValueError:
+        pass
+    return fields
+
+
+def scan_detail_fields(html: bytes) -> dict:
+    """Collect the first value of each embedded JSON key in one pass"""
+    fields = {}
+    for match in _RE_DETAIL_FIELDS.finditer(html):
+        key = match.lastgroup
+        if key not in fields:
+            fields[key] = match.group(key).decode(errors='replace')
+            if len(fields) == _DETAIL_FIELD_COUNT:
+                break
+    return fields
 
-        if not html or not success:
-            print(f"[Airbnb] Requests failed for details, trying Playwright...", file=sys.stderr)
-            html, success = fetch_with_playwright(url, wait_time=3)
 
-        if not html or not success:
-            print(f"[Airbnb] Failed to fetch details for {listing_id}", file=sys.stderr)
-            return None
+def find_detail_price(html: bytes) -> int:
+    """Return the price from the highest-priority pattern that matches, or None"""
+    best = None
+    for match in _RE_DETAIL_PRICE.finditer(html):
+        if best is None or match.lastindex < best.lastindex:
+            best = match
+            if best.lastindex == 1:
+                break
+    return int(best.group(best.lastindex)) if best else None
 
+
+def parse_listing_details(listing_id: str, html: bytes) -> dict:
+    """Extract listing details from a fetched listing page"""
+    try:
         details = {
             'platform': 'airbnb',
             'platform_id': listing_id,
@@ -303,11 +734,12 @@ def scrape_listing_details(listing_id: str, check_in: str = None, check_out: str
             'scraped_at': datetime.now().isoformat(),
         }
 
+        jsonld, state = extract_page_scripts(html)
+
         # Extract from JSON-LD structured data
-        jsonld_match = re.search(r'application/ld\+json">(\{[^<]+\})', html)
-        if jsonld_match:
+        if jsonld:
             try:
-                data = json.loads(jsonld_match.group(1))
+                data = loads_json(jsonld)
 
                 # Name/Title
                 if 'name' in data:
@@ -329,7 +761,7 @@ def scrape_listing_details(listing_id: str, check_in: str = None, check_out: str
                     if 'ratingCount' in rating:
                         try:
                             details['num_reviews'] = int(rating['ratingCount'])
-                        except:
+                        except (TypeError, ValueError):
                             pass
 
                 # Occupancy/Guests
@@ -338,134 +770,112 @@ def scrape_listing_details(listing_id: str, check_in: str = None, check_out: str
                     if 'occupancy' in place and 'value' in place['occupancy']:
                         details['max_guests'] = int(place['occupancy']['value'])
 
-            except json.JSONDecodeError:
+            except ValueError:
                 pass
 
+        # Read keys from the deferred state blob; regex-scan only for the rest
+        fields = read_deferred_state(state) if state else {}
+        if len(fields) < _DETAIL_FIELD_COUNT:
+            for key, value in scan_detail_fields(html).items():
+                fields.setdefault(key, value)
+
         # Extract room type
-        room_match = re.search(r'"roomType":"([^"]+)"', html)
-        if room_match:
-            details['property_type'] = room_match.group(1)
-
-        # Extract bedrooms - try multiple patterns
-        bedroom_match = re.search(r'"bedrooms":(\d+)', html)
-        if bedroom_match:
-            details['bedrooms'] = int(bedroom_match.group(1))
+        if 'roomType' in fields:
+            details['property_type'] = fields['roomType']
+
+        # Extract bedrooms - fall back to "X bedroom" text
+        if 'bedrooms' in fields:
+            details['bedrooms'] = int(fields['bedrooms'])
         else:
-            # Fallback: look for "X bedroom" text
-            bedroom_text = re.search(r'(\d+)\s*bedroom', html, re.IGNORECASE)
+            bedroom_text = _RE_BEDROOMS_TEXT.search(html)
             if bedroom_text:
                 details['bedrooms'] = int(bedroom_text.group(1))
 
         # Extract beds
-        beds_match = re.search(r'"beds":(\d+)', html)
-        if beds_match:
-            details['beds'] = int(beds_match.group(1))
+        if 'beds' in fields:
+            details['beds'] = int(fields['beds'])
         else:
-            beds_text = re.search(r'(\d+)\s*bed[^r]', html, re.IGNORECASE)
+            beds_text = _RE_BEDS_TEXT.search(html)
             if beds_text:
                 details['beds'] = int(beds_text.group(1))
 
         # Extract bathrooms
-        bath_match = re.search(r'"bathrooms":(\d+)', html)
-        if bath_match:
-            details['bathrooms'] = int(bath_match.group(1))
+        if 'bathrooms' in fields:
+            details['bathrooms'] = int(fields['bathrooms'])
         else:
-            bath_text = re.search(r'(\d+)\s*bath', html, re.IGNORECASE)
+            bath_text = _RE_BATHROOMS_TEXT.search(html)
             if bath_text:
                 details['bathrooms'] = int(bath_text.group(1))
 
         # Extract person capacity
         if 'max_guests' not in details:
-            capacity_match = re.search(r'"personCapacity":(\d+)', html)
-            if capacity_match:
-                details['max_guests'] = int(capacity_match.group(1))
+            if 'personCapacity' in fields:
+                details['max_guests'] = int(fields['personCapacity'])
             else:
-                guest_text = re.search(r'(\d+)\s*guest', html, re.IGNORECASE)
+                guest_text = _RE_GUESTS_TEXT.search(html)
                 if guest_text:
                     details['max_guests'] = int(guest_text.group(1))
 
         # Extract GPS coordinates
-        lat_match = re.search(r'"lat(?:itude)?":(-?\d+\.\d+)', html)
-        lng_match = re.search(r'"(?:lng|longitude)":(-?\d+\.\d+)', html)
-        if lat_match:
-            details['latitude'] = float(lat_match.group(1))
-        if lng_match:
-            details['longitude'] = float(lng_match.group(1))
+        if 'lat' in fields:
+            details['latitude'] = float(fields['lat'])
+        if 'lng' in fields:
+            details['longitude'] = float(fields['lng'])
 
         # Extract city/location
-        city_match = re.search(r'"city":"([^"]+)"', html)
-        if city_match:
-            details['city'] = city_match.group(1)
-
-        address_match = re.search(r'"addressLocality":"([^"]+)"', html)
-        if address_match:
-            details['neighborhood'] = address_match.group(1)
+        if 'city' in fields:
+            details['city'] = fields['city']
+        if 'addressLocality' in fields:
+            details['neighborhood'] = fields['addressLocality']
 
         # Extract host ID
-        host_id_match = re.search(r'"hostId":"?(\d+)"?', html)
-        if host_id_match:
-            details['host_id'] = host_id_match.group(1)
-
-        # Extract host name - try multiple patterns
-        host_match = re.search(r'"hostDisplayName":"([^"]+)"', html)
-        if host_match:
-            details['host_name'] = host_match.group(1)
+        if 'hostId' in fields:
+            details['host_id'] = str(fields['hostId'])
+
+        # Extract host name - fall back to "Hosted by X"
+        if 'hostDisplayName' in fields:
+            details['host_name'] = fields['hostDisplayName']
         else:
-            # Fallback: "Hosted by X" pattern
-            hosted_by = re.search(r'Hosted by ([^<"]+)', html)
+            hosted_by = _RE_HOSTED_BY.search(html)
             if hosted_by:
-                details['host_name'] = hosted_by.group(1).strip()
-
-        # Extract price - try multiple patterns
-        price_patterns = [
-            r'\$(\d+)\s*/?\s*night',
-            r'(\d+)\s*\$\s*/?\s*night',
-            r'"priceString":"[^"]*\$(\d+)',
-            r'"price":(\d+)',
-            r'"amount":(\d+).*?"currency":"USD"',
-        ]
-        for pattern in price_patterns:
-            price_match = re.search(pattern, html, re.IGNORECASE)
-            if price_match:
-                try:
-                    details['price'] = int(price_match.group(1))
-                    details['currency'] = 'USD'
-                    break
-                except:
-                    pass
+                details['host_name'] = hosted_by.group(1).decode(errors='replace').strip()
+
+        # Extract price - first match of the highest-priority pattern
+        price = find_detail_price(html)
+        if price is not None:
+            details['price'] = price
+            details['currency'] = 'USD'
 
         # Also try to find price in visible text like "$45 night"
         if 'price' not in details:
-            visible_price = re.search(r'\$(\d{2,4})\s*(?:per\s*)?night', html, re.IGNORECASE)
+            visible_price = _RE_VISIBLE_PRICE.search(html)
             if visible_price:
                 details['price'] = int(visible_price.group(1))
                 details['currency'] = 'USD'
 
         # Extract amenities - filter out noise
         amenities = []
-        amenity_pattern = r'"title":"([^"]+)","icon":"[A-Z_]+"'
-        amenity_matches = re.findall(amenity_pattern, html)
+        amenity_matches = _RE_AMENITY.findall(html)
         if amenity_matches:
             # Get unique amenities, filter out UI elements
             seen = set()
-            skip_words = ['report', 'show', 'more', 'less', 'view', 'close', 'back', 'next']
             for a in amenity_matches:
-                a_lower = a.lower()
+                a = a.decode(errors='replace')
                 if (a not in seen and
                     len(a) < 50 and
-                    not any(skip in a_lower for skip in skip_words)):
+                    not _RE_AMENITY_SKIP.search(a)):
                     amenities.append(a)
                     seen.add(a)
             details['amenities'] = amenities[:25]  # Limit to 25
 
         # Extract superhost status
-        if 'Superhost' in html:
+        if b'Superhost' in html:
             details['is_superhost'] = True
 
         return details
 
     except Exception as e:
-        print(f"[Airbnb] Error fetching details for {listing_id}: {e}", file=sys.stderr)
+        print(f"[Airbnb] Error parsing details for {listing_id}: {e}", file=sys.stderr)
         import traceback
         traceback.print_exc()
         return None
@@ -481,26 +891,25 @@ def scrape_airbnb_with_details(city: str = "Dakar", country: str = "Senegal",
     print(f"\n[Airbnb] Getting details for {min(len(basic_listings), max_details)} listings...", file=sys.stderr)
 
     detailed_listings = []
-    session = requests.Session()  # Reuse session for connection pooling
+    to_detail = basic_listings[:max_details]
 
-    for i, listing in enumerate(basic_listings[:max_details]):
-        # Get full details
-        details = scrape_listing_details(listing['platform_id'], session=session)
+    if AIOHTTP_AVAILABLE:
+        all_details = asyncio.run(scrape_details_async([l.platform_id for l in to_detail]))
+    else:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+            all_details = list(executor.map(
+                scrape_listing_details_worker, [l.platform_id for l in to_detail]
+            ))
 
+    for listing, details in zip(to_detail, all_details):
         if details:
             # Merge basic and detailed data
-            full_listing = {**listing, **details}
+            full_listing = {**listing.to_dict(), **details}
             detailed_listings.append(full_listing)
         else:
             # Keep basic listing if details failed
             detailed_listings.append(listing)
 
-        # Rate limit
-        if i < max_details - 1:
-            delay = 2 + (i * 0.3)
-            print(f"[Airbnb] Rate limiting: {delay:.1f}s...", file=sys.stderr)
-            time.sleep(delay)
-
     # Add remaining listings without details
     for listing in basic_listings[max_details:]:
         detailed_listings.append(listing)
@@ -508,22 +917,35 @@ def scrape_airbnb_with_details(city: str = "Dakar", country: str = "Senegal",
     return detailed_listings
 
 
-def parse_airbnb_card(card) -> dict:
+def parse_card_price(price_text: str) -> int:
+    """Price from the highest-priority card pattern whose match is a number, or None"""
+    first_matches = {}
+    for match in _RE_CARD_PRICE.finditer(price_text.replace('\xa0', ' ')):
+        first_matches.setdefault(match.lastindex, match.group(match.lastindex))
+
+    for _, raw in sorted(first_matches.items()):
+        digits = raw.replace(' ', '').replace(',', '')
+        if digits.isdecimal():
+            return int(digits)
+    return None
+
+
+def parse_airbnb_card(card, scraped_at: str = None) -> dict:
     """Parse a single Airbnb listing card"""
 
     listing = {
         'platform': 'airbnb',
-        'scraped_at': datetime.now().isoformat()
+        'scraped_at': scraped_at or datetime.now().isoformat()
     }
 
     # Get link/URL
     link = card.css_first('a[href*="/rooms/"]')
     if link:
-        href = link.attrib.get('href', '')
+        href = link.attrib.get('href')
         if href:
             listing['url'] = f"https://www.airbnb.com{href}" if href.startswith('/') else href
             # Extract room ID
-            match = re.search(r'/rooms/(\d+)', href)
+            match = _RE_CARD_ROOM_ID.search(href)
             if match:
                 listing['platform_id'] = match.group(1)
 
@@ -535,62 +957,33 @@ def parse_airbnb_card(card) -> dict:
         title_text = title_el.text.strip()
         listing['title'] = title_text
         # Extract neighborhood from "Apartment in Neighborhood"
-        location_match = re.search(r'in\s+(.+)$', title_text)
+        location_match = _RE_CARD_LOCATION.search(title_text)
         if location_match:
             listing['neighborhood'] = location_match.group(1)
             listing['city'] = 'Dakar'
 
-    # Get price - try multiple selectors
-    price_el = None
-    price_selectors = [
-        '[data-testid="price-availability-row"]',
-        'span._1y74zjx',
-        'span[aria-hidden="true"]._1ks8cgb',  # Price span
-        '._1jo4hgw',  # Price container
-        'div._tt122m',  # Another price pattern
-    ]
-    for selector in price_selectors:
-        price_el = card.css_first(selector)
-        if price_el:
-            break
+    # Get price - first selector that matches
+    price_el = next(filter(None, map(card.css_first, _CARD_PRICE_SELECTORS)), None)
 
     if price_el:
-        price_text = price_el.text
-        # Try multiple price patterns: "$123", "123 $", "123€", "XOF 12,345"
-        patterns = [
-            r'\$\s*([\d,]+)',  # $123 or $ 123
-            r'([\d,]+)\s*\$',  # 123$ or 123 $
-            r'([\d,]+)\s*€',   # 123€
-            r'([\d\s,]+)\s*(?:XOF|CFA|FCFA)',  # XOF prices
-            r'([\d,]+)\s*/\s*night',  # 123/night
-            r'([\d,]+)\s*per night',  # 123 per night
-        ]
-        for pattern in patterns:
-            match = re.search(pattern, price_text.replace('\xa0', ' '), re.IGNORECASE)
-            if match:
-                price_str = match.group(1).replace(' ', '').replace(',', '')
-                try:
-                    listing['price'] = int(price_str)
-                    break
-                except:
-                    pass
+        # Price patterns: "$123", "123 $", "123€", "XOF 12,345"
+        price = parse_card_price(price_el.text)
+        if price is not None:
+            listing['price'] = price
 
     # Also try to get price from text content of entire card
     if 'price' not in listing:
         card_text = card.text if hasattr(card, 'text') else ''
-        price_match = re.search(r'\$(\d+)', card_text)
+        price_match = _RE_CARD_TEXT_PRICE.search(card_text)
         if price_match:
-            try:
-                listing['price'] = int(price_match.group(1))
-            except:
-                pass
+            listing['price'] = int(price_match.group(1))
 
     # Get rating
     rating_el = card.css_first('[aria-label*="rating"]')
     if not rating_el:
         rating_el = card.css_first('[aria-label*="Rating"]')
     if rating_el:
-        match = re.search(r'(\d+[.,]\d+)', rating_el.attrib.get('aria-label', ''))
+        match = _RE_CARD_RATING.search(rating_el.attrib.get('aria-label', ''))
         if match:
             listing['rating'] = float(match.group(1).replace(',', '.'))
 
@@ -599,14 +992,11 @@ def parse_airbnb_card(card) -> dict:
         spans = card.css('span')
         for span in spans:
             text = span.text.strip() if span.text else ''
-            if re.match(r'^\d+\.\d{1,2}$', text):
-                try:
-                    rating = float(text)
-                    if 1.0 <= rating <= 5.0:
-                        listing['rating'] = rating
-                        break
-                except:
-                    pass
+            if _RE_RATING_TEXT.match(text):
+                rating = float(text)
+                if 1.0 <= rating <= 5.0:
+                    listing['rating'] = rating
+                    break
 
     # Get all images, not just first one
     imgs = card.css('img[src*="muscache"]')
@@ -635,8 +1025,7 @@ def parse_airbnb_card(card) -> dict:
 
     # Try to extract property type from title
     if not listing.get('property_type') and listing.get('title'):
-        prop_match = re.match(r'^(Apartment|Room|House|Villa|Condo|Place|Entire|Private|Shared)',
-                              listing['title'], re.IGNORECASE)
+        prop_match = _RE_PROPERTY_TYPE.match(listing['title'])
         if prop_match:
             listing['property_type'] = prop_match.group(1)
 
@@ -659,6 +1048,7 @@ def scrape_expat_dakar_stealth(city: str = "Dakar", max_pages: int = 5):
 
         cards = page.css('.listing-card')
         print(f"[ExpatDakar] Found {len(cards)} listings")
+        scraped_at = datetime.now().isoformat()
 
         for card in cards[:10]:
             try:
@@ -671,7 +1061,7 @@ def scrape_expat_dakar_stealth(city: str = "Dakar", max_pages: int = 5):
                     'url': link.attrib.get('href') if link else None,
                     'title': title_img.attrib.get('alt') if title_img else None,
                     'price': price_el.text.strip() if price_el else None,
-                    'scraped_at': datetime.now().isoformat()
+                    'scraped_at': scraped_at
                 }
 
                 if listing['url']:
@@ -737,14 +1127,13 @@ def normalize_amenities(amenities: list) -> list:
 
     normalized = []
     seen = set()
-    skip_words = ['show', 'more', 'less', 'view', 'close', 'automatically translated']
 
     for amenity in amenities:
         if not amenity or len(amenity) < 2 or len(amenity) > 50:
             continue
-        lower = amenity.lower().strip()
-        if any(skip in lower for skip in skip_words):
+        if _RE_NORMALIZE_SKIP.search(amenity):
             continue
+        lower = amenity.lower().strip()
 
         normalized_name = amenity_map.get(lower, amenity)
         key = normalized_name.lower()
@@ -772,6 +1161,85 @@ def calculate_data_quality(listing: dict) -> int:
     return score
 
 
+# scraped_listings columns copied as-is from listing fields: (column, field)
+LISTING_COLUMNS = (
+    ('url', 'url'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('price', 'price'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('host_name', 'host_name'),
+    ('host_id', 'host_id'),
+    ('num_rooms', 'bedrooms'),
+    ('num_guests', 'max_guests'),
+    ('rating', 'rating'),
+    ('num_reviews', 'num_reviews'),
+)
+
+# Listing fields kept in the raw_data column
+RAW_DATA_FIELDS = ('property_type', 'bathrooms', 'beds', 'is_superhost', 'neighborhood', 'scraped_at')
+
+
+def build_row(listing: dict, last_seen_at: str) -> dict:
+    """scraped_listings row for a listing, normalized like the TypeScript normalizer.ts
+
+    Table columns: id, platform, platform_id, url, title, description, price,
+    currency, location_text, city, region, latitude, longitude, host_name,
+    host_id, num_rooms, num_guests, photos, amenities, rating, num_reviews,
+    status, matched_property_id, is_compliant, compliance_checked_at,
+    first_seen_at, last_seen_at, raw_data, created_at, updated_at
+
+    Listing fields map to columns through LISTING_COLUMNS (bedrooms ->
+    num_rooms, max_guests -> num_guests), the RAW_DATA_FIELDS go to raw_data.
+    """
+    # Repeated category strings are interned so rows share one copy
+    city = normalize_city(listing.get('city', 'Dakar'))
+    region = determine_region(city)
+    city = city and sys.intern(city)
+    region = region and sys.intern(region)
+    currency = listing.get('currency', 'USD')
+    currency = currency and sys.intern(currency)
+
+    # Collections are normalized or sliced only when present
+    amenities = listing.get('amenities')
+    amenities = amenities and normalize_amenities(amenities)
+    photos = listing.get('photos')
+    photos = photos and photos[:20]
+
+    data = {
+        'platform': sys.intern(listing['platform']),
+        'platform_id': str(listing['platform_id']),
+        'last_seen_at': last_seen_at,
+    }
+
+    # Only set columns that have a value, to avoid database errors
+    for column, key in LISTING_COLUMNS:
+        value = listing.get(key)
+        if value is not None:
+            data[column] = value
+
+    # Columns with defaults, fallbacks or normalization
+    for column, value in (
+        ('currency', currency),
+        ('location_text', listing.get('neighborhood') or listing.get('location_text')),
+        ('city', city),
+        ('region', region),
+    ):
+        if value is not None:
+            data[column] = value
+
+    if photos:
+        data['photos'] = photos
+    if amenities:
+        data['amenities'] = amenities
+
+    raw_data = {key: value for key in RAW_DATA_FIELDS if (value := listing.get(key)) is not None}
+    if raw_data:
+        data['raw_data'] = raw_data
+    return data
+
+
 def save_to_supabase(listings: list):
     """Save listings to Supabase database with standardized/normalized data
 
@@ -795,70 +1263,26 @@ def save_to_supabase(listings: list):
         return False
 
     supabase = create_client(supabase_url, supabase_key)
+    listings = listing_dicts(listings)
 
-    saved_count = 0
+    # Normalized rows, with the quality scores of the listings they came from,
+    # all computed before the upsert starts
+    rows = []
     quality_scores = []
+    last_seen_at = datetime.now(timezone.utc).isoformat()
 
     for listing in listings:
         try:
-            # Normalize data (matching TypeScript normalizer.ts)
-            city = normalize_city(listing.get('city', 'Dakar'))
-            region = determine_region(city)
-            amenities = normalize_amenities(listing.get('amenities', []))
-
-            # STANDARDIZED data object matching database schema
-            # Columns: id, platform, platform_id, url, title, description, price,
-            # currency, location_text, city, region, latitude, longitude, host_name,
-            # host_id, num_rooms, num_guests, photos, amenities, rating, num_reviews,
-            # status, matched_property_id, is_compliant, compliance_checked_at,
-            # first_seen_at, last_seen_at, raw_data, created_at, updated_at
-            data = {
-                'platform': listing['platform'],
-                'platform_id': str(listing['platform_id']),
-                'url': listing.get('url'),
-                'title': listing.get('title'),
-                'description': listing.get('description'),
-                'price': listing.get('price'),
-                'currency': listing.get('currency', 'USD'),
-                'location_text': listing.get('neighborhood') or listing.get('location_text'),
-                'city': city,
-                'region': region,
-                'latitude': listing.get('latitude'),
-                'longitude': listing.get('longitude'),
-                'host_name': listing.get('host_name'),
-                'host_id': listing.get('host_id'),
-                'num_rooms': listing.get('bedrooms'),
-                'num_guests': listing.get('max_guests'),
-                'photos': listing.get('photos', [])[:20],
-                'amenities': amenities,
-                'rating': listing.get('rating'),
-                'num_reviews': listing.get('num_reviews'),
-                'raw_data': {
-                    'property_type': listing.get('property_type'),
-                    'bathrooms': listing.get('bathrooms'),
-                    'beds': listing.get('beds'),
-                    'is_superhost': listing.get('is_superhost'),
-                    'neighborhood': listing.get('neighborhood'),
-                    'scraped_at': listing.get('scraped_at'),
-                },
-                'last_seen_at': datetime.now().isoformat(),
-            }
-
-            # Remove None values to avoid database errors
-            data = {k: v for k, v in data.items() if v is not None}
-
-            result = supabase.table('scraped_listings').upsert(
-                data,
-                on_conflict='platform,platform_id'
-            ).execute()
-
-            saved_count += 1
+            rows.append(build_row(listing, last_seen_at))
             quality_scores.append(calculate_data_quality(listing))
 
         except Exception as e:
             print(f"[ERROR] Failed to save {listing.get('platform_id')}: {e}", file=sys.stderr)
 
-    avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
+    saved = upsert_rows(supabase, 'scraped_listings', rows)
+
+    saved_count = len(saved)
+    avg_quality = sum(quality_scores[i] for i in saved) / saved_count if saved else 0
     print(f"[Supabase] Saved {saved_count}/{len(listings)} listings (avg quality: {avg_quality:.0f}%)", file=sys.stderr)
     return True
 
@@ -874,7 +1298,7 @@ if __name__ == '__main__':
     parser.add_argument('--details', type=int, default=0, help='Max listings to get full details for (0=none)')
     parser.add_argument('--output', default='listings.json', help='Output file')
     parser.add_argument('--save-db', action='store_true', help='Save to Supabase database')
-    parser.add_argument('--json-stdout', action='store_true', help='Output JSON to stdout (for Node.js)')
+    parser.add_argument('--json-stdout', action='store_true', help='Output NDJSON to stdout, one listing per line (for Node.js)')
 
     args = parser.parse_args()
 
@@ -898,21 +1322,32 @@ if __name__ == '__main__':
 
         listings.extend(listings_airbnb)
 
+    listings = listing_dicts(listings)
+
     # Output results
     if args.json_stdout:
-        # Clean output for Node.js consumption
-        print(json.dumps(listings, ensure_ascii=False))
+        # Clean output for Node.js consumption: one listing per line (NDJSON),
+        # written as UTF-8 bytes so the payload is never built as a whole
+        sys.stdout.flush()
+        out = sys.stdout.buffer
+        for listing in listings:
+            out.write(dumps_json_bytes(listing) + b'\n')
+        out.flush()
     else:
         print(f"\n{'='*50}", file=sys.stderr)
         print(f"Total listings scraped: {len(listings)}", file=sys.stderr)
 
         if listings:
             print("\nSample listing:", file=sys.stderr)
-            print(json.dumps(listings[0], indent=2, ensure_ascii=False), file=sys.stderr)
-
-            # Save to file
-            with open(args.output, 'w', encoding='utf-8') as f:
-                json.dump(listings, f, indent=2, ensure_ascii=False)
+            print(dumps_json(listings[0], pretty=True), file=sys.stderr)
+
+            # Save to file (one listing per line for a .jsonl output)
+            with open(args.output, 'wb') as f:
+                if args.output.endswith('.jsonl'):
+                    for listing in listings:
+                        f.write(dumps_json_bytes(listing) + b'\n')
+                else:
+                    f.write(dumps_json_bytes(listings, pretty=True))
             print(f"\nSaved to {args.output}", file=sys.stderr)
 
     # Optionally save to database
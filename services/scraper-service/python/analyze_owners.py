@@ -3,76 +3,271 @@
 
 from supabase import create_client
 import os
+import re
+import sys
 from collections import defaultdict
 from dotenv import load_dotenv
 
+# Try to import pandas for vectorized grouping
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    print("[Warning] pandas not available, grouping listings row by row", file=sys.stderr)
+
+# Try to import pyarrow to keep the pandas key columns as Arrow strings
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Try to import orjson to decode listing pages straight from the response bytes
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Try to import psycopg2 to read listings over a direct Postgres connection
+try:
+    import psycopg2
+    from psycopg2 import sql
+    from psycopg2.extras import RealDictCursor
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
 load_dotenv()
 load_dotenv('../.env')
 
 url = os.getenv('SUPABASE_URL')
 key = os.getenv('SUPABASE_SERVICE_ROLE_KEY')
+db_url = os.getenv('SUPABASE_DB_URL')
 supabase = create_client(url, key)
 
-# Fetch all listings
-result = supabase.table('scraped_listings').select('platform, host_name, host_id, raw_data, title, url').execute()
+# Non-digit characters stripped from phone numbers
+_RE_NON_DIGIT = re.compile(r'\D')
+
+# Rows per select request (PostgREST's default max-rows)
+PAGE_SIZE = 1000
+
+# Rows per round trip of the server-side cursor on a direct connection
+CURSOR_ITERSIZE = 10000
+
+
+def fetch_page(table: str, select: str, offset: int, page: int) -> list:
+    """One id-ordered page of rows
+
+    With orjson the page is fetched through the client's PostgREST session
+    and decoded from the raw body, skipping the stdlib json decode.
+    """
+    if ORJSON_AVAILABLE:
+        response = supabase.postgrest.session.get(table, params={
+            'select': select.replace(' ', ''),
+            'order': 'id',
+            'offset': offset,
+            'limit': page,
+        })
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+    return (
+        supabase.table(table)
+        .select(select)
+        .order('id')
+        .range(offset, offset + page - 1)
+        .execute()
+        .data
+    )
 
-# Group by phone number
-phones = defaultdict(list)
-host_ids = defaultdict(list)
 
-for r in result.data:
-    raw = r.get('raw_data', {}) or {}
-    phone = raw.get('phone') or raw.get('phoneNumber')
-    host_id = r.get('host_id')
+def fetch_all(table: str, select: str, page: int = PAGE_SIZE):
+    """Yield every row of a table, one page of rows per request"""
+    offset = 0
+    while True:
+        rows = fetch_page(table, select, offset, page)
+        yield from rows
+        if len(rows) < page:
+            break
+        offset += page
 
-    listing_info = {
+
+def fetch_all_pg(table: str, select: str):
+    """Yield every row of a table from a server-side cursor over a direct Postgres connection"""
+    columns = [column.strip() for column in select.split(',')]
+    query = sql.SQL("SELECT {} FROM {} ORDER BY id").format(
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        sql.Identifier(table),
+    )
+
+    conn = psycopg2.connect(db_url)
+    try:
+        with conn.cursor('analyze_owners', cursor_factory=RealDictCursor) as cur:
+            cur.itersize = CURSOR_ITERSIZE
+            cur.execute(query)
+            yield from cur
+    finally:
+        conn.close()
+
+
+def listing_phone(raw):
+    """Phone number of a listing's raw_data, if any"""
+    raw = raw or {}
+    return raw.get('phone') or raw.get('phoneNumber')
+
+
+def listing_info(r: dict) -> dict:
+    """Fields of a listing shown in the report"""
+    return {
         'title': (r.get('title') or '')[:50],
         'platform': r.get('platform'),
         'host_name': r.get('host_name'),
         'url': r.get('url')
     }
 
-    # Group by phone
-    if phone:
-        digits = ''.join(c for c in str(phone) if c.isdigit())
-        if len(digits) >= 9:
-            digits = digits[-9:]
-            phones[digits].append(listing_info)
 
-    # Group by host_id (Airbnb)
-    if host_id:
-        host_ids[host_id].append(listing_info)
+def group_owners_pandas(rows: list):
+    """Group row indices by phone (last 9 digits) and host_id with pandas groupby
+
+    With pyarrow the keys are Arrow-backed strings, so the digit stripping,
+    slicing and grouping run on columnar buffers rather than Python objects.
+    """
+    string_dtype = 'string[pyarrow]' if PYARROW_AVAILABLE else str
+    df = pd.DataFrame(rows, columns=['raw_data', 'host_id'])
+
+    phones = df['raw_data'].map(listing_phone)
+    phones = phones[phones.map(bool)]
+    digits = phones.astype(str).astype(string_dtype).str.replace(_RE_NON_DIGIT.pattern, '', regex=True)
+    digits = digits[digits.str.len() >= 9].str[-9:]
+
+    host_ids = df['host_id']
+    host_ids = host_ids[host_ids.notna() & host_ids.map(bool)].astype(string_dtype)
+
+    def grouped(keys):
+        groups = {k: list(v) for k, v in keys.groupby(keys, sort=False).groups.items()}
+        return groups, keys[keys.duplicated()].unique().tolist()
+
+    phones, multi_phones = grouped(digits)
+    host_groups, multi_hosts = grouped(host_ids)
+    return phones, host_groups, multi_phones, multi_hosts
+
+
+def group_owners(rows: list):
+    """Group row indices by phone (last 9 digits) and host_id
+
+    Also returns the keys of each grouping that have more than one listing,
+    collected as they reach their second listing.
+    """
+    if PANDAS_AVAILABLE and rows:
+        return group_owners_pandas(rows)
+
+    phones = defaultdict(list)
+    host_ids = defaultdict(list)
+    multi_phones = []
+    multi_hosts = []
+
+    for i, r in enumerate(rows):
+        phone = listing_phone(r.get('raw_data'))
+        host_id = r.get('host_id')
+
+        # Group by phone
+        if phone:
+            digits = _RE_NON_DIGIT.sub('', str(phone))
+            if len(digits) >= 9:
+                digits = digits[-9:]
+                indices = phones[digits]
+                indices.append(i)
+                if len(indices) == 2:
+                    multi_phones.append(digits)
+
+        # Group by host_id (Airbnb)
+        if host_id:
+            indices = host_ids[host_id]
+            indices.append(i)
+            if len(indices) == 2:
+                multi_hosts.append(host_id)
+
+    return phones, host_ids, multi_phones, multi_hosts
+
+
+def multi_owner_groups(groups: dict, multi_keys: list, rows: list) -> dict:
+    """Multi-listing groups, as (listing count, first 3 listings)"""
+    # First-seen order, so ties in the report sort as before
+    multi_keys = sorted(multi_keys, key=lambda k: groups[k][0])
+    return {
+        k: (len(groups[k]), [listing_info(rows[i]) for i in groups[k][:3]])
+        for k in multi_keys
+    }
+
+
+def analyze_locally():
+    """Fetch every listing and group owners client-side
+
+    Listings are read over a direct Postgres connection when SUPABASE_DB_URL
+    is set, bypassing PostgREST, otherwise page by page through the API.
+    """
+    select = 'platform, host_name, host_id, raw_data, title, url'
+    if PSYCOPG2_AVAILABLE and db_url:
+        rows = list(fetch_all_pg('scraped_listings', select))
+    else:
+        rows = list(fetch_all('scraped_listings', select))
+    phones, host_ids, multi_phones, multi_hosts = group_owners(rows)
+    stats = {
+        'total_listings': len(rows),
+        'listings_with_phone': sum(len(lst) for lst in phones.values()),
+        'unique_phones': len(phones),
+    }
+    return stats, multi_owner_groups(phones, multi_phones, rows), multi_owner_groups(host_ids, multi_hosts, rows)
+
+
+def analyze_in_database():
+    """Fetch owner groups already aggregated by the database (migration 00015)"""
+    groups = supabase.rpc('get_multi_owners', {'min_count': 2}).execute().data
+    stats = supabase.rpc('get_owner_stats').execute().data[0]
+    multi_by_phone = {}
+    multi_by_id = {}
+    for g in groups:
+        target = multi_by_phone if g['match_type'] == 'phone' else multi_by_id
+        target[g['owner_key']] = (g['listing_count'], g['sample_listings'])
+    return stats, multi_by_phone, multi_by_id
+
+
+try:
+    stats, multi_by_phone, multi_by_id = analyze_in_database()
+except Exception as e:
+    print(f"[Warning] Owner aggregation functions unavailable ({e}), grouping listings locally", file=sys.stderr)
+    stats, multi_by_phone, multi_by_id = analyze_locally()
 
 print('=' * 60)
 print('OWNER INTELLIGENCE REPORT')
 print('=' * 60)
 
 # Multi-property by phone
-multi_by_phone = {p: lst for p, lst in phones.items() if len(lst) > 1}
 print(f'\n📞 MULTI-PROPERTY OWNERS BY PHONE: {len(multi_by_phone)}')
-for phone, listings in sorted(multi_by_phone.items(), key=lambda x: -len(x[1]))[:10]:
-    print(f'\n  +221{phone} ({len(listings)} properties):')
-    for l in listings[:3]:
+for phone, (count, listings) in sorted(multi_by_phone.items(), key=lambda x: -x[1][0])[:10]:
+    print(f'\n  +221{phone} ({count} properties):')
+    for l in listings:
         print(f'    • [{l["platform"]}] {l["title"]}')
-    if len(listings) > 3:
-        print(f'    ... and {len(listings)-3} more')
+    if count > 3:
+        print(f'    ... and {count-3} more')
 
 # Multi-property by host_id
-multi_by_id = {h: lst for h, lst in host_ids.items() if len(lst) > 1}
 print(f'\n🏠 MULTI-PROPERTY HOSTS (Airbnb/Booking): {len(multi_by_id)}')
-for host_id, listings in sorted(multi_by_id.items(), key=lambda x: -len(x[1]))[:5]:
+for host_id, (count, listings) in sorted(multi_by_id.items(), key=lambda x: -x[1][0])[:5]:
     host_name = listings[0].get('host_name', 'Unknown')
-    print(f'\n  Host: {host_name} (ID: {host_id}) - {len(listings)} properties')
-    for l in listings[:3]:
+    print(f'\n  Host: {host_name} (ID: {host_id}) - {count} properties')
+    for l in listings:
         print(f'    • {l["title"]}')
 
 # Summary
 print('\n' + '=' * 60)
 print('SUMMARY')
 print('=' * 60)
-print(f'Total listings: {len(result.data)}')
-print(f'Listings with phone: {sum(len(lst) for lst in phones.values())}')
-print(f'Unique phone numbers: {len(phones)}')
+print(f'Total listings: {stats["total_listings"]}')
+print(f'Listings with phone: {stats["listings_with_phone"]}')
+print(f'Unique phone numbers: {stats["unique_phones"]}')
 print(f'Multi-property owners (phone): {len(multi_by_phone)}')
-print(f'Listings from multi-owners: {sum(len(l) for l in multi_by_phone.values())}')
+print(f'Listings from multi-owners: {sum(count for count, _ in multi_by_phone.values())}')
 print(f'Airbnb hosts with multiple properties: {len(multi_by_id)}')
@@ -12,6 +12,13 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'venv', 'lib', 'pytho
 
 from supabase import create_client
 
+# Try to import psycopg2 to run the migration over a direct Postgres connection
+try:
+    import psycopg2
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
 supabase_url = os.environ.get('SUPABASE_URL')
 supabase_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
 
@@ -21,26 +28,36 @@ if not supabase_url or not supabase_key:
 
 supabase = create_client(supabase_url, supabase_key)
 
-# Read migration file
-migration_path = '/Users/aliounebadarambengue/Desktop/dallal/supabase/migrations/00008_detected_owners.sql'
-with open(migration_path) as f:
-    migration_sql = f.read()
+# Migration file (defaults to the repo's detected_owners migration)
+migration_path = sys.argv[1] if len(sys.argv) > 1 else os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    '..', '..', '..', 'supabase', 'migrations', '00008_detected_owners.sql'
+)
+migration_path = os.path.normpath(migration_path)
 
-# Split into statements and execute
-statements = [s.strip() for s in migration_sql.split(';') if s.strip() and not s.strip().startswith('--')]
+# Supabase doesn't allow DDL via the API, so the migration can only be run
+# directly against Postgres (SUPABASE_DB_URL, the project's connection string)
+db_url = os.environ.get('SUPABASE_DB_URL')
 
-print(f"Executing {len(statements)} statements...")
+if db_url and PSYCOPG2_AVAILABLE:
+    with open(migration_path) as f:
+        migration_sql = f.read()
 
-for i, stmt in enumerate(statements):
-    if stmt.strip():
-        try:
-            # Use raw SQL execution via RPC or direct query
-            # Note: Supabase doesn't allow DDL via the API, so we'll check if tables exist
-            print(f"Statement {i+1}: {stmt[:50]}...")
-        except Exception as e:
-            print(f"Error on statement {i+1}: {e}")
+    print(f"Executing {migration_path}...")
+    conn = psycopg2.connect(db_url)
+    try:
+        # Whole file in one transaction: committed on success, rolled back on error
+        with conn, conn.cursor() as cur:
+            cur.execute(migration_sql)
+        print("Migration applied")
+    except Exception as e:
+        print(f"Migration failed: {e}")
+    finally:
+        conn.close()
+elif db_url:
+    print("[Warning] psycopg2 not installed, cannot run the migration. Run: pip install psycopg2-binary")
 
-# Instead, let's check if the tables exist
+# Check if the tables exist
 print("\nChecking if tables exist...")
 
 try:
@@ -4,18 +4,97 @@ Booking.com Senegal Scraper
 Uses requests with anti-bot headers, falls back to Playwright if blocked
 """
 
+import asyncio
+import atexit
 import json
+import queue
 import sys
 import os
 import re
+import threading
 import time
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache, partial
 from urllib.parse import urlencode
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, Tag
+
+from supabase_upsert import upsert_rows
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'venv', 'lib', 'python3.11', 'site-packages'))
 
+# Try to import lxml so BeautifulSoup can use its C parser
+try:
+    import lxml  # noqa: F401
+    BS4_PARSER = 'lxml'
+except ImportError:
+    BS4_PARSER = 'html.parser'
+    print("[Warning] lxml not available, parsing HTML with html.parser", file=sys.stderr)
+
+# Try to import selectolax to parse search result cards with Lexbor
+try:
+    from selectolax.lexbor import LexborHTMLParser
+    SELECTOLAX_AVAILABLE = True
+except ImportError:
+    SELECTOLAX_AVAILABLE = False
+    print("[Warning] selectolax not available, parsing search results with lxml or BeautifulSoup", file=sys.stderr)
+
+# Try to import lxml's compiled CSS selectors for search cards without selectolax
+try:
+    import lxml.html
+    from lxml.cssselect import CSSSelector
+    LXML_CSSSELECT_AVAILABLE = True
+except ImportError:
+    LXML_CSSSELECT_AVAILABLE = False
+
+# Try to import aiohttp for concurrent page fetches
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    print("[Warning] aiohttp not available, fetching pages sequentially", file=sys.stderr)
+
+# Try to import httpx with h2 to fetch pages over HTTP/2
+try:
+    import httpx
+    import h2  # noqa: F401
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+# Try to import orjson for faster parsing of the embedded listing JSON and
+# serialization of the scraped listings
+try:
+    import orjson
+    loads_json = orjson.loads
+
+    def dumps_json_bytes(obj, pretty: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+except ImportError:
+    loads_json = json.loads
+
+    def dumps_json_bytes(obj, pretty: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False).encode()
+
+
+def dumps_json(obj, pretty: bool = False) -> str:
+    return dumps_json_bytes(obj, pretty).decode()
+
+# Try to import a brotli decoder (used by urllib3, httpx and aiohttp for br bodies)
+try:
+    import brotli  # noqa: F401
+    BROTLI_AVAILABLE = True
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        BROTLI_AVAILABLE = True
+    except ImportError:
+        BROTLI_AVAILABLE = False
+        print("[Warning] brotli not available, requesting gzip pages only", file=sys.stderr)
+
 # City to Booking.com destination ID mapping
 DESTINATION_IDS = {
     'dakar': '-2271854',
@@ -27,13 +106,28 @@ DESTINATION_IDS = {
     'thies': '-2281143',
     'senegal': '-2271854',
 }
+DEFAULT_DESTINATION_ID = DESTINATION_IDS['dakar']
+
+# Search URL parameters shared by every search page, encoded once (build_search_url)
+SEARCH_PARAMS = (
+    ('dest_type', 'city'),
+    ('group_adults', '2'),
+    ('no_rooms', '1'),
+    ('group_children', '0'),
+    ('nflt', 'ht_id=201;ht_id=220'),  # Apartments + Vacation Homes
+    ('order', 'popularity'),
+    ('selected_currency', 'XOF'),
+)
+_SEARCH_QUERY = urlencode(SEARCH_PARAMS)
 
 # Anti-bot headers
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
     'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8',
     'Accept-Language': 'fr-FR,fr;q=0.9,en-US;q=0.8,en;q=0.7',
-    'Accept-Encoding': 'gzip, deflate, br',
+    # Only advertise br when it can be decoded; otherwise a brotli body
+    # would reach the parsers still compressed
+    'Accept-Encoding': 'gzip, deflate, br' if BROTLI_AVAILABLE else 'gzip, deflate',
     'Cache-Control': 'no-cache',
     'Pragma': 'no-cache',
     'Sec-Ch-Ua': '"Not_A Brand";v="8", "Chromium";v="120", "Google Chrome";v="120"',
@@ -46,6 +140,70 @@ HEADERS = {
     'Upgrade-Insecure-Requests': '1',
 }
 
+# Shared requests session: keeps connections to booking.com alive across
+# search and detail fetches
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=16))
+
+# Shared HTTP/2 client used instead of the requests session when httpx is
+# installed: requests multiplex over one connection to booking.com
+_HTTP2_CLIENT = httpx.Client(
+    http2=True,
+    timeout=30,
+    follow_redirects=True,
+    limits=httpx.Limits(max_keepalive_connections=10),
+) if HTTPX_AVAILABLE else None
+
+# Max Booking pages fetched at once (aiohttp tasks or detail worker threads)
+MAX_CONCURRENT_FETCHES = 6
+
+# Seconds each fetch slot is held after a fetch, to keep the request rate polite
+FETCH_SLOT_DELAY = 2
+
+# Block-page marker checked on every fetch (fetchers)
+_RE_CAPTCHA = re.compile(r'captcha', re.IGNORECASE)
+
+# Search card patterns (parse_card)
+_RE_HOTEL_SLUG = re.compile(r'/hotel/sn/([^/.?]+)')
+_RE_HOTEL_ID = re.compile(r'hotel_id=(\d+)')
+_RE_PRICE = re.compile(r'(\d[\d\s,]*)|(XOF|CFA|EUR|USD|€|\$)')
+_RE_RATING = re.compile(r'(\d+[.,]?\d*)')
+_RE_REVIEW_COUNT = re.compile(r'(\d[\d\s]*)')
+
+# Currency of each marker matched by _RE_PRICE
+PRICE_CURRENCIES = {'XOF': 'XOF', 'CFA': 'XOF', 'EUR': 'EUR', '€': 'EUR', 'USD': 'USD', '$': 'USD'}
+
+# Embedded listing arrays on search pages (extract_from_json)
+_RE_JSON_LISTINGS = (
+    re.compile(r'"hotels"\s*:\s*(\[.*?\])', re.DOTALL),
+    re.compile(r'"properties"\s*:\s*(\[.*?\])', re.DOTALL),
+)
+
+# Detail page patterns (scrape_listing_details)
+_RE_GEO = re.compile(
+    r'b_map_center_(latitude|longitude)["\s:=]+(-?\d+\.?\d*)'
+    r'|"(latitude|longitude)"\s*:\s*(-?\d+\.?\d*)'
+)
+_RE_BEDROOMS = re.compile(r'(\d+)\s*(?:chambre|bedroom)', re.IGNORECASE)
+_RE_BATHROOMS = re.compile(r'(\d+)\s*(?:salle de bain|bathroom)', re.IGNORECASE)
+_RE_GUESTS = re.compile(r'(\d+)\s*(?:personne|guest|voyageur)', re.IGNORECASE)
+
+# Title keywords to property type, highest priority first (detect_property_type)
+PROPERTY_TYPE_KEYWORDS = {
+    'villa': 'villa',
+    'studio': 'studio',
+    'appartement': 'apartment',
+    'apartment': 'apartment',
+    'maison': 'house',
+    'house': 'house',
+    'chambre': 'room',
+    'room': 'room',
+    'hotel': 'hotel',
+    'hôtel': 'hotel',
+}
+_PROPERTY_TYPE_PRIORITY = {keyword: i for i, keyword in enumerate(PROPERTY_TYPE_KEYWORDS)}
+_RE_PROPERTY_TYPE = re.compile('|'.join(PROPERTY_TYPE_KEYWORDS), re.IGNORECASE)
+
 
 def build_search_url(city: str, page: int = 0, check_in: str = None, check_out: str = None) -> str:
     """Build Booking.com search URL"""
@@ -54,75 +212,174 @@ def build_search_url(city: str, page: int = 0, check_in: str = None, check_out:
         check_in = (today + timedelta(days=7)).strftime('%Y-%m-%d')
         check_out = (today + timedelta(days=12)).strftime('%Y-%m-%d')
 
-    dest_id = DESTINATION_IDS.get(city.lower(), DESTINATION_IDS['dakar'])
-
-    params = {
-        'ss': f'{city}, Senegal',
-        'dest_id': dest_id,
-        'dest_type': 'city',
-        'checkin': check_in,
-        'checkout': check_out,
-        'group_adults': '2',
-        'no_rooms': '1',
-        'group_children': '0',
-        'nflt': 'ht_id=201;ht_id=220',  # Apartments + Vacation Homes
-        'order': 'popularity',
-        'selected_currency': 'XOF',
-    }
+    params = [
+        ('ss', f'{city}, Senegal'),
+        ('dest_id', DESTINATION_IDS.get(city.lower(), DEFAULT_DESTINATION_ID)),
+        ('checkin', check_in),
+        ('checkout', check_out),
+    ]
 
     if page > 0:
-        params['offset'] = str(page * 25)
+        params.append(('offset', str(page * 25)))
 
-    return f"https://www.booking.com/searchresults.fr.html?{urlencode(params)}"
+    return f"https://www.booking.com/searchresults.fr.html?{urlencode(params)}&{_SEARCH_QUERY}"
+
+
+def build_listing_url(listing_id: str) -> str:
+    """Build Booking.com listing page URL"""
+    return f"https://www.booking.com/hotel/sn/{listing_id}.fr.html"
 
 
 def fetch_with_requests(url: str, session: requests.Session = None) -> tuple:
-    """Fetch URL with requests, return (html, success)"""
+    """Fetch URL with requests, return (html, success)
+
+    Uses the shared HTTP/2 client by default when httpx is installed,
+    otherwise the shared requests session.
+    """
     if session is None:
-        session = requests.Session()
+        session = _HTTP2_CLIENT if HTTPX_AVAILABLE else _SESSION
 
     try:
         response = session.get(url, headers=HEADERS, timeout=30)
         response.raise_for_status()
 
         # Check if blocked
-        if 'captcha' in response.text.lower() or response.status_code == 403:
+        html = response.text
+        if _RE_CAPTCHA.search(html) or response.status_code == 403:
             return None, False
 
-        return response.text, True
+        return html, True
     except Exception as e:
         print(f"[Booking] Request error: {e}", file=sys.stderr)
         return None, False
 
 
+class StealthBrowser:
+    """One scrapling stealth browser shared by every Playwright fetch
+
+    Sync Playwright is bound to the thread that started it, so the browser
+    session is opened lazily and driven from a single worker thread; callers
+    from any thread (including run_in_executor workers) queue a fetch and
+    block on its result.
+    """
+
+    def __init__(self):
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _worker(self):
+        """Own the browser session and run queued fetches until shutdown"""
+        session = None
+
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+
+            future, url = job
+            try:
+                if session is None:
+                    from scrapling.fetchers import StealthySession
+
+                    session = StealthySession(headless=True, wait=8)
+                    session.start()
+
+                page = session.fetch(url)
+                future.set_result(str(page.html_content))
+            except Exception as e:
+                future.set_exception(e)
+
+        if session is not None:
+            session.close()
+
+    def fetch(self, url: str) -> str:
+        """Load url in the shared stealth browser and return its HTML"""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._worker, name='stealth-browser', daemon=True)
+                self._thread.start()
+
+        future = Future()
+        self._jobs.put((future, url))
+        return future.result()
+
+    def shutdown(self):
+        """Close the browser and stop the worker thread, if it was started"""
+        with self._lock:
+            if self._thread is None:
+                return
+            self._jobs.put(None)
+            self._thread.join()
+            self._thread = None
+
+
+stealth_browser = StealthBrowser()
+atexit.register(stealth_browser.shutdown)
+
+
 def fetch_with_playwright(url: str) -> tuple:
-    """Fetch URL with Playwright stealth browser"""
+    """Fetch URL with the shared Playwright stealth browser"""
     try:
-        from scrapling.fetchers import StealthyFetcher
-
-        page = StealthyFetcher.fetch(
-            url,
-            headless=True,
-            wait=8,
-        )
-        return str(page.html_content), True
+        return stealth_browser.fetch(url), True
     except Exception as e:
         print(f"[Booking] Playwright error: {e}", file=sys.stderr)
         return None, False
 
 
-def scrape_booking_search(city: str = "Dakar", max_pages: int = 3, use_browser: bool = False) -> list:
-    """Scrape Booking.com search results"""
-    all_listings = []
-    session = requests.Session()
+async def fetch_async(session, url: str) -> tuple:
+    """Fetch URL using aiohttp with anti-bot headers"""
+    try:
+        async with session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as response:
+            if response.status == 403:
+                return None, False
+            response.raise_for_status()
+            html = await response.text()
 
-    for page_num in range(max_pages):
-        url = build_search_url(city, page_num)
+            # Check if blocked
+            if _RE_CAPTCHA.search(html):
+                return None, False
 
-        print(f"\n[Booking] Page {page_num + 1}/{max_pages} - {city}...", file=sys.stderr)
-        print(f"[Booking] URL: {url}", file=sys.stderr)
+            return html, True
+    except Exception as e:
+        print(f"[Booking] Request error: {e}", file=sys.stderr)
+        return None, False
+
+
+async def fetch_page_async(session, sem, url: str) -> tuple:
+    """Fetch URL with aiohttp, falling back to Playwright in a worker thread
+
+    The semaphore caps concurrent requests; each slot is held for a short
+    delay after the fetch to keep the request rate polite.
+    """
+    async with sem:
+        html, success = await fetch_async(session, url)
+
+        if not html or not success:
+            print("[Booking] aiohttp blocked, trying Playwright...", file=sys.stderr)
+            loop = asyncio.get_running_loop()
+            html, success = await loop.run_in_executor(None, fetch_with_playwright, url)
+
+        await asyncio.sleep(FETCH_SLOT_DELAY)
 
-        # Try requests first, fall back to Playwright
+    return html, success
+
+
+async def fetch_all_async(urls: list) -> list:
+    """Fetch several URLs concurrently, returning (html, success) in order"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONCURRENT_FETCHES, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        return await asyncio.gather(*(fetch_page_async(session, sem, url) for url in urls))
+
+
+def fetch_search_pages(urls: list, use_browser: bool = False, session: requests.Session = None):
+    """Yield (html, success) for each search page, one at a time
+
+    Tries requests first, then falls back to Playwright for this and the
+    remaining pages, with an increasing delay before each following page.
+    """
+    for page_num, url in enumerate(urls):
         if use_browser:
             html, success = fetch_with_playwright(url)
         else:
@@ -132,20 +389,52 @@ def scrape_booking_search(city: str = "Dakar", max_pages: int = 3, use_browser:
                 html, success = fetch_with_playwright(url)
                 use_browser = True  # Switch to browser for remaining pages
 
+        yield html, success
+
+        # Rate limiting
+        if page_num < len(urls) - 1:
+            delay = 3 + page_num
+            print(f"[Booking] Waiting {delay}s...", file=sys.stderr)
+            time.sleep(delay)
+
+
+def save_debug_html(html: str, path: str = '/tmp/booking_debug.html'):
+    """Write a fetched page to disk for inspection"""
+    with open(path, 'w') as f:
+        f.write(html)
+    print(f"[Booking] Debug HTML saved to {path}", file=sys.stderr)
+
+
+def scrape_booking_search(city: str = "Dakar", max_pages: int = 3, use_browser: bool = False,
+                          session: requests.Session = None) -> list:
+    """Scrape Booking.com search results"""
+    all_listings = []
+    scraped_at = datetime.now().isoformat()  # One timestamp for the whole scrape
+    urls = [build_search_url(city, page_num) for page_num in range(max_pages)]
+
+    if AIOHTTP_AVAILABLE and not use_browser:
+        # Fetch every page at once; pagination still stops at the first empty page
+        print(f"\n[Booking] Fetching {len(urls)} pages concurrently - {city}...", file=sys.stderr)
+        pages = asyncio.run(fetch_all_async(urls))
+    else:
+        pages = fetch_search_pages(urls, use_browser, session)
+
+    for page_num, (html, success) in enumerate(pages):
+        print(f"\n[Booking] Page {page_num + 1}/{max_pages} - {city}...", file=sys.stderr)
+        print(f"[Booking] URL: {urls[page_num]}", file=sys.stderr)
+
         if not success or not html:
             print(f"[Booking] Failed to fetch page {page_num + 1}", file=sys.stderr)
             continue
 
         print(f"[Booking] Page fetched successfully", file=sys.stderr)
 
-        # Save debug HTML
-        if page_num == 0:
-            with open('/tmp/booking_debug.html', 'w') as f:
-                f.write(html)
-            print("[Booking] Debug HTML saved to /tmp/booking_debug.html", file=sys.stderr)
+        # Save debug HTML (opt-in), off the parsing path
+        if page_num == 0 and os.environ.get('BOOKING_DEBUG_HTML'):
+            threading.Thread(target=save_debug_html, args=(html,), name='debug-html').start()
 
         # Parse listings
-        page_listings = parse_search_results(html)
+        page_listings = parse_search_results(html, scraped_at)
 
         print(f"[Booking] Extracted {len(page_listings)} listings", file=sys.stderr)
 
@@ -154,133 +443,185 @@ def scrape_booking_search(city: str = "Dakar", max_pages: int = 3, use_browser:
 
         all_listings.extend(page_listings)
 
-        # Rate limiting
-        if page_num < max_pages - 1:
-            delay = 3 + page_num
-            print(f"[Booking] Waiting {delay}s...", file=sys.stderr)
-            time.sleep(delay)
-
     return all_listings
 
 
-def parse_search_results(html: str) -> list:
+def parse_search_results(html: str, scraped_at: str = None) -> list:
     """Parse Booking.com search results HTML"""
     listings = []
+    if scraped_at is None:
+        scraped_at = datetime.now().isoformat()
     seen_ids = set()
 
-    soup = BeautifulSoup(html, 'html.parser')
+    if SELECTOLAX_AVAILABLE:
+        select = LexborHTMLParser(html).css
+    elif LXML_CSSSELECT_AVAILABLE:
+        select = partial(css_select, lxml.html.fromstring(html))
+    else:
+        select = BeautifulSoup(html, BS4_PARSER).select
 
     # Find property cards
-    cards = soup.select('[data-testid="property-card"]')
+    cards = select('[data-testid="property-card"]')
     if not cards:
-        cards = soup.select('.sr_property_block')
+        cards = select('.sr_property_block')
     if not cards:
-        cards = soup.select('[data-hotelid]')
+        cards = select('[data-hotelid]')
 
     print(f"[Booking] Found {len(cards)} property cards", file=sys.stderr)
 
     for card in cards:
         try:
-            listing = parse_card(card)
-            if listing and listing.get('platform_id') and listing['platform_id'] not in seen_ids:
-                seen_ids.add(listing['platform_id'])
+            listing = parse_card(card, scraped_at)
+            platform_id = listing and listing['platform_id']
+            if platform_id and platform_id not in seen_ids:
+                seen_ids.add(platform_id)
                 listings.append(listing)
         except Exception as e:
             print(f"[Booking] Card parse error: {e}", file=sys.stderr)
 
-    # Fallback: extract from JSON
+    # Fallback: extract from JSON, scanning only the page scripts
     if len(listings) < 3:
-        json_listings = extract_from_json(html)
+        scripts_text = '\n'.join(node_text(script) for script in select('script'))
+        json_listings = extract_from_json(scripts_text, scraped_at)
         for listing in json_listings:
-            if listing.get('platform_id') and listing['platform_id'] not in seen_ids:
-                seen_ids.add(listing['platform_id'])
+            platform_id = listing['platform_id']
+            if platform_id not in seen_ids:
+                seen_ids.add(platform_id)
                 listings.append(listing)
 
     return listings
 
 
-def parse_card(card) -> dict:
+@lru_cache(maxsize=None)
+def css_selector(selector: str):
+    """lxml CSSSelector for a selector, compiled to XPath once"""
+    return CSSSelector(selector)
+
+
+def css_select(node, selector: str) -> list:
+    """Elements of an lxml tree matching a CSS selector"""
+    return css_selector(selector)(node)
+
+
+def is_lxml_element(el) -> bool:
+    return LXML_CSSSELECT_AVAILABLE and isinstance(el, lxml.html.HtmlElement)
+
+
+def select_first(node, *selectors):
+    """First element matching one of the selectors, tried in order
+
+    Works on selectolax nodes, lxml elements and BeautifulSoup tags.
+    """
+    for selector in selectors:
+        if isinstance(node, Tag):
+            el = node.select_one(selector)
+        elif is_lxml_element(node):
+            el = next(iter(css_select(node, selector)), None)
+        else:
+            el = node.css_first(selector)
+        if el is not None:
+            return el
+    return None
+
+
+def node_text(el, strip: bool = False) -> str:
+    """Text content of a selectolax node, lxml element or BeautifulSoup tag"""
+    if isinstance(el, Tag):
+        return el.get_text(strip=strip)
+    if is_lxml_element(el):
+        if strip:
+            return ''.join(text.strip() for text in el.itertext())
+        return el.text_content()
+    return el.text(strip=strip)
+
+
+def node_attr(el, name: str):
+    """Attribute value of a selectolax node, lxml element or BeautifulSoup tag"""
+    if isinstance(el, Tag) or is_lxml_element(el):
+        return el.get(name)
+    return el.attributes.get(name)
+
+
+def parse_card(card, scraped_at: str = None) -> dict:
     """Parse a single property card"""
     listing = {
         'platform': 'booking',
-        'scraped_at': datetime.now().isoformat(),
+        'scraped_at': scraped_at or datetime.now().isoformat(),
         'currency': 'XOF',
     }
 
     # Get hotel ID
-    hotel_id = card.get('data-hotelid')
+    hotel_id = node_attr(card, 'data-hotelid')
     if not hotel_id:
-        link = card.select_one('a[href*="/hotel/"]')
-        if link:
-            href = link.get('href', '')
-            match = re.search(r'/hotel/sn/([^/.?]+)', href)
+        link = select_first(card, 'a[href*="/hotel/"]')
+        if link is not None:
+            href = node_attr(link, 'href') or ''
+            match = _RE_HOTEL_SLUG.search(href)
             if match:
                 hotel_id = match.group(1)
             else:
-                match = re.search(r'hotel_id=(\d+)', href)
+                match = _RE_HOTEL_ID.search(href)
                 if match:
                     hotel_id = match.group(1)
 
     if hotel_id:
         listing['platform_id'] = hotel_id
-        listing['url'] = f"https://www.booking.com/hotel/sn/{hotel_id}.fr.html"
+        listing['url'] = build_listing_url(hotel_id)
 
     # Title
-    title_el = card.select_one('[data-testid="title"]') or card.select_one('.sr-hotel__name') or card.select_one('h3')
-    if title_el:
-        listing['title'] = title_el.get_text(strip=True)
+    title_el = select_first(card, '[data-testid="title"]', '.sr-hotel__name', 'h3')
+    if title_el is not None:
+        listing['title'] = node_text(title_el, strip=True)
 
     # Price
-    price_el = (card.select_one('[data-testid="price-and-discounted-price"]') or
-                card.select_one('.bui-price-display__value') or
-                card.select_one('.prco-valign-middle-helper'))
-
-    if price_el:
-        price_text = price_el.get_text()
-        price_match = re.search(r'([\d\s]+)', price_text.replace('\xa0', ' '))
-        if price_match:
-            try:
-                listing['price'] = int(price_match.group(1).replace(' ', '').replace(',', ''))
-            except:
-                pass
-
-        if 'XOF' in price_text or 'CFA' in price_text:
-            listing['currency'] = 'XOF'
-        elif '€' in price_text:
-            listing['currency'] = 'EUR'
-        elif '$' in price_text:
-            listing['currency'] = 'USD'
+    price_el = select_first(card, '[data-testid="price-and-discounted-price"]',
+                            '.bui-price-display__value', '.prco-valign-middle-helper')
+
+    if price_el is not None:
+        # First amount and first currency marker, in one scan
+        price = currency = None
+        for price_match in _RE_PRICE.finditer(node_text(price_el)):
+            amount, marker = price_match.groups()
+            if amount and price is None:
+                price = int(''.join(amount.split()).replace(',', ''))
+            elif marker and currency is None:
+                currency = PRICE_CURRENCIES[marker]
+
+        if price is not None:
+            listing['price'] = price
+        if currency:
+            listing['currency'] = currency
 
     # Location
-    loc_el = card.select_one('[data-testid="address"]') or card.select_one('.sr_card_address_line')
-    if loc_el:
-        listing['location_text'] = loc_el.get_text(strip=True)
+    loc_el = select_first(card, '[data-testid="address"]', '.sr_card_address_line')
+    if loc_el is not None:
+        listing['location_text'] = node_text(loc_el, strip=True)
         parts = listing['location_text'].split(',')
         if len(parts) >= 2:
             listing['neighborhood'] = parts[0].strip()
             listing['city'] = parts[1].strip()
 
     # Rating (10-point scale)
-    rating_el = card.select_one('[data-testid="review-score"]') or card.select_one('.bui-review-score__badge')
-    if rating_el:
-        rating_text = rating_el.get_text(strip=True)
-        rating_match = re.search(r'(\d+[.,]?\d*)', rating_text)
+    rating_el = select_first(card, '[data-testid="review-score"]', '.bui-review-score__badge')
+    if rating_el is not None:
+        rating_text = node_text(rating_el, strip=True)
+        rating_match = _RE_RATING.search(rating_text)
         if rating_match:
             rating = float(rating_match.group(1).replace(',', '.'))
             listing['rating'] = round(rating / 2, 1) if rating > 5 else rating
 
     # Review count
-    review_el = card.select_one('.bui-review-score__text')
-    if review_el:
-        review_text = review_el.get_text()
-        review_match = re.search(r'(\d[\d\s]*)', review_text)
+    review_el = select_first(card, '.bui-review-score__text')
+    if review_el is not None:
+        review_text = node_text(review_el)
+        review_match = _RE_REVIEW_COUNT.search(review_text)
         if review_match:
             listing['num_reviews'] = int(review_match.group(1).replace(' ', ''))
 
     # Image
-    img_el = card.select_one('img[data-testid="image"]') or card.select_one('.hotel_image') or card.select_one('img')
-    if img_el:
-        src = img_el.get('src') or img_el.get('data-src')
+    img_el = select_first(card, 'img[data-testid="image"]', '.hotel_image', 'img')
+    if img_el is not None:
+        src = node_attr(img_el, 'src') or node_attr(img_el, 'data-src')
         if src and not src.startswith('data:'):
             listing['photos'] = [src]
 
@@ -288,33 +629,31 @@ def parse_card(card) -> dict:
     if listing.get('title'):
         listing['property_type'] = detect_property_type(listing['title'])
 
-    return listing if listing.get('platform_id') else None
+    return listing if hotel_id else None
 
 
-def extract_from_json(html: str) -> list:
-    """Extract listings from embedded JSON"""
+def extract_from_json(html: str, scraped_at: str = None) -> list:
+    """Extract listings from embedded JSON (a page, or just its script text)"""
     listings = []
+    if scraped_at is None:
+        scraped_at = datetime.now().isoformat()
 
-    patterns = [
-        r'"hotels"\s*:\s*(\[.*?\])',
-        r'"properties"\s*:\s*(\[.*?\])',
-    ]
-
-    for pattern in patterns:
-        matches = re.findall(pattern, html, re.DOTALL)
-        for match in matches[:1]:  # Take first match only
+    for pattern in _RE_JSON_LISTINGS:
+        match = pattern.search(html)  # First match only
+        if match:
             try:
-                data = json.loads(match)
+                data = loads_json(match.group(1))
                 for item in data[:30]:  # Limit
                     listing = {
                         'platform': 'booking',
-                        'scraped_at': datetime.now().isoformat(),
+                        'scraped_at': scraped_at,
                     }
 
+                    platform_id = None
                     if 'hotel_id' in item:
-                        listing['platform_id'] = str(item['hotel_id'])
+                        platform_id = str(item['hotel_id'])
                     elif 'id' in item:
-                        listing['platform_id'] = str(item['id'])
+                        platform_id = str(item['id'])
 
                     if 'hotel_name' in item:
                         listing['title'] = item['hotel_name']
@@ -336,8 +675,9 @@ def extract_from_json(html: str) -> list:
                     if 'longitude' in item:
                         listing['longitude'] = float(item['longitude'])
 
-                    if listing.get('platform_id'):
-                        listing['url'] = f"https://www.booking.com/hotel/sn/{listing['platform_id']}.fr.html"
+                    if platform_id:
+                        listing['platform_id'] = platform_id
+                        listing['url'] = build_listing_url(platform_id)
                         listings.append(listing)
             except:
                 pass
@@ -347,7 +687,7 @@ def extract_from_json(html: str) -> list:
 
 def scrape_listing_details(listing_id: str, session: requests.Session = None) -> dict:
     """Scrape full details from listing page"""
-    url = f"https://www.booking.com/hotel/sn/{listing_id}.fr.html"
+    url = build_listing_url(listing_id)
 
     print(f"[Booking] Fetching details for {listing_id}...", file=sys.stderr)
 
@@ -358,12 +698,48 @@ def scrape_listing_details(listing_id: str, session: requests.Session = None) ->
     if not success or not html:
         return None
 
-    soup = BeautifulSoup(html, 'html.parser')
+    return parse_listing_details(listing_id, html)
+
+
+def scrape_listing_details_worker(listing_id: str) -> dict:
+    """scrape_listing_details for a worker thread, holding it for a short
+    delay afterwards to keep the request rate polite"""
+    details = scrape_listing_details(listing_id)
+    time.sleep(FETCH_SLOT_DELAY)
+    return details
+
+
+async def scrape_listing_details_async(session, sem, listing_id: str) -> dict:
+    """Async variant of scrape_listing_details sharing an aiohttp session"""
+    url = build_listing_url(listing_id)
+
+    print(f"[Booking] Fetching details for {listing_id}...", file=sys.stderr)
+
+    html, success = await fetch_page_async(session, sem, url)
+    if not success or not html:
+        return None
+
+    return parse_listing_details(listing_id, html)
+
+
+async def scrape_details_async(listing_ids: list) -> list:
+    """Fetch and parse several listing pages concurrently, in input order"""
+    sem = asyncio.Semaphore(MAX_CONCURRENT_FETCHES)
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONCURRENT_FETCHES, keepalive_timeout=30)
+    async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+        return await asyncio.gather(*(
+            scrape_listing_details_async(session, sem, listing_id) for listing_id in listing_ids
+        ))
+
+
+def parse_listing_details(listing_id: str, html: str) -> dict:
+    """Parse a listing page's HTML into a details dict"""
+    soup = BeautifulSoup(html, BS4_PARSER)
 
     details = {
         'platform': 'booking',
         'platform_id': listing_id,
-        'url': url,
+        'url': build_listing_url(listing_id),
         'scraped_at': datetime.now().isoformat(),
     }
 
@@ -386,23 +762,19 @@ def scrape_listing_details(listing_id: str, session: requests.Session = None) ->
             details['neighborhood'] = parts[0].strip()
             details['city'] = parts[1].strip()
 
-    # GPS from scripts
-    lat_match = re.search(r'b_map_center_latitude["\s:=]+(-?\d+\.?\d*)', html)
-    lng_match = re.search(r'b_map_center_longitude["\s:=]+(-?\d+\.?\d*)', html)
-    if lat_match:
-        details['latitude'] = float(lat_match.group(1))
-    if lng_match:
-        details['longitude'] = float(lng_match.group(1))
-
-    # Alternative GPS
-    if 'latitude' not in details:
-        geo_match = re.search(r'"latitude"\s*:\s*(-?\d+\.?\d*)', html)
-        if geo_match:
-            details['latitude'] = float(geo_match.group(1))
-    if 'longitude' not in details:
-        geo_match = re.search(r'"longitude"\s*:\s*(-?\d+\.?\d*)', html)
-        if geo_match:
-            details['longitude'] = float(geo_match.group(1))
+    # GPS from scripts: map center first, any JSON coordinates as fallback
+    map_center = {}
+    alternative = {}
+    for geo_match in _RE_GEO.finditer(html):
+        map_field, map_value, json_field, json_value = geo_match.groups()
+        if map_field:
+            map_center.setdefault(map_field, map_value)
+            if len(map_center) == 2:
+                break
+        else:
+            alternative.setdefault(json_field, json_value)
+    for field, value in {**alternative, **map_center}.items():
+        details[field] = float(value)
 
     # Amenities
     amenities = []
@@ -421,17 +793,15 @@ def scrape_listing_details(listing_id: str, session: requests.Session = None) ->
     details['photos'] = photos[:15]
 
     # Room details from text
-    page_text = html.lower()
-
-    bedroom_match = re.search(r'(\d+)\s*(?:chambre|bedroom)', page_text)
+    bedroom_match = _RE_BEDROOMS.search(html)
     if bedroom_match:
         details['bedrooms'] = int(bedroom_match.group(1))
 
-    bath_match = re.search(r'(\d+)\s*(?:salle de bain|bathroom)', page_text)
+    bath_match = _RE_BATHROOMS.search(html)
     if bath_match:
         details['bathrooms'] = int(bath_match.group(1))
 
-    guest_match = re.search(r'(\d+)\s*(?:personne|guest|voyageur)', page_text)
+    guest_match = _RE_GUESTS.search(html)
     if guest_match:
         details['max_guests'] = int(guest_match.group(1))
 
@@ -453,43 +823,35 @@ def scrape_booking_with_details(city: str = "Dakar", max_pages: int = 2, max_det
 
     print(f"\n[Booking] Getting details for {min(len(basic_listings), max_details)} listings...", file=sys.stderr)
 
-    session = requests.Session()
-    detailed_listings = []
+    to_detail = basic_listings[:max_details]
 
-    for i, listing in enumerate(basic_listings[:max_details]):
-        details = scrape_listing_details(listing['platform_id'], session)
+    if AIOHTTP_AVAILABLE:
+        all_details = asyncio.run(scrape_details_async([l['platform_id'] for l in to_detail]))
+    else:
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_FETCHES) as executor:
+            all_details = list(executor.map(
+                scrape_listing_details_worker, [l['platform_id'] for l in to_detail]
+            ))
 
+    detailed_listings = []
+    for listing, details in zip(to_detail, all_details):
         if details:
             full_listing = {**listing, **details}
             detailed_listings.append(full_listing)
         else:
             detailed_listings.append(listing)
 
-        if i < max_details - 1:
-            delay = 2 + (i * 0.3)
-            print(f"[Booking] Rate limiting: {delay:.1f}s...", file=sys.stderr)
-            time.sleep(delay)
-
     detailed_listings.extend(basic_listings[max_details:])
     return detailed_listings
 
 
 def detect_property_type(text: str) -> str:
     """Detect property type from text"""
-    lower = text.lower()
-    if 'villa' in lower:
-        return 'villa'
-    if 'studio' in lower:
-        return 'studio'
-    if any(x in lower for x in ['appartement', 'apartment']):
-        return 'apartment'
-    if any(x in lower for x in ['maison', 'house']):
-        return 'house'
-    if 'chambre' in lower or 'room' in lower:
-        return 'room'
-    if 'hotel' in lower or 'hôtel' in lower:
-        return 'hotel'
-    return 'other'
+    keywords = _RE_PROPERTY_TYPE.findall(text)
+    if not keywords:
+        return 'other'
+    keyword = min((k.lower() for k in keywords), key=_PROPERTY_TYPE_PRIORITY.__getitem__)
+    return PROPERTY_TYPE_KEYWORDS[keyword]
 
 
 def normalize_city(city: str) -> str:
@@ -516,6 +878,54 @@ def determine_region(city: str) -> str:
     return region_map.get(city, 'Dakar')
 
 
+# scraped_listings columns copied from listing fields when set (build_listing_row)
+LISTING_COLUMNS = (
+    ('url', 'url'),
+    ('title', 'title'),
+    ('description', 'description'),
+    ('price', 'price'),
+    ('location_text', 'location_text'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('host_name', 'host_name'),
+    ('num_rooms', 'bedrooms'),
+    ('num_guests', 'max_guests'),
+    ('rating', 'rating'),
+    ('num_reviews', 'num_reviews'),
+)
+
+# Listing fields kept in the raw_data column
+RAW_DATA_FIELDS = ('property_type', 'bathrooms', 'neighborhood', 'scraped_at')
+
+
+def build_listing_row(listing: dict, last_seen_at: str) -> dict:
+    """scraped_listings row for a listing, without None columns"""
+    city = normalize_city(listing.get('city', 'Dakar'))
+
+    data = {
+        'platform': 'booking',
+        'platform_id': str(listing['platform_id']),
+        'city': city,
+        'region': determine_region(city),
+        'photos': listing.get('photos', [])[:20],
+        'amenities': listing.get('amenities', [])[:30],
+        'raw_data': {key: listing.get(key) for key in RAW_DATA_FIELDS},
+        'last_seen_at': last_seen_at,
+    }
+
+    # Only set columns that have a value
+    for column, key in LISTING_COLUMNS:
+        value = listing.get(key)
+        if value is not None:
+            data[column] = value
+
+    currency = listing.get('currency', 'XOF')
+    if currency is not None:
+        data['currency'] = currency
+
+    return data
+
+
 def save_to_supabase(listings: list) -> bool:
     """Save listings to Supabase"""
     try:
@@ -532,54 +942,17 @@ def save_to_supabase(listings: list) -> bool:
         return False
 
     supabase = create_client(supabase_url, supabase_key)
-    saved_count = 0
+    rows = []
+    last_seen_at = datetime.now(timezone.utc).isoformat()
 
     for listing in listings:
         try:
-            city = normalize_city(listing.get('city', 'Dakar'))
-            region = determine_region(city)
-
-            data = {
-                'platform': 'booking',
-                'platform_id': str(listing['platform_id']),
-                'url': listing.get('url'),
-                'title': listing.get('title'),
-                'description': listing.get('description'),
-                'price': listing.get('price'),
-                'currency': listing.get('currency', 'XOF'),
-                'location_text': listing.get('location_text'),
-                'city': city,
-                'region': region,
-                'latitude': listing.get('latitude'),
-                'longitude': listing.get('longitude'),
-                'host_name': listing.get('host_name'),
-                'num_rooms': listing.get('bedrooms'),
-                'num_guests': listing.get('max_guests'),
-                'photos': listing.get('photos', [])[:20],
-                'amenities': listing.get('amenities', [])[:30],
-                'rating': listing.get('rating'),
-                'num_reviews': listing.get('num_reviews'),
-                'raw_data': {
-                    'property_type': listing.get('property_type'),
-                    'bathrooms': listing.get('bathrooms'),
-                    'neighborhood': listing.get('neighborhood'),
-                    'scraped_at': listing.get('scraped_at'),
-                },
-                'last_seen_at': datetime.now().isoformat(),
-            }
-
-            data = {k: v for k, v in data.items() if v is not None}
-
-            supabase.table('scraped_listings').upsert(
-                data,
-                on_conflict='platform,platform_id'
-            ).execute()
-
-            saved_count += 1
-
+            rows.append(build_listing_row(listing, last_seen_at))
         except Exception as e:
             print(f"[ERROR] Failed to save {listing.get('platform_id')}: {e}", file=sys.stderr)
 
+    saved_count = len(upsert_rows(supabase, 'scraped_listings', rows))
+
     print(f"[Supabase] Saved {saved_count}/{len(listings)} listings", file=sys.stderr)
     return True
 
@@ -613,10 +986,10 @@ if __name__ == '__main__':
 
     if listings:
         print("\nSample listing:", file=sys.stderr)
-        print(json.dumps(listings[0], indent=2, ensure_ascii=False), file=sys.stderr)
+        print(dumps_json(listings[0], pretty=True), file=sys.stderr)
 
-        with open(args.output, 'w', encoding='utf-8') as f:
-            json.dump(listings, f, indent=2, ensure_ascii=False)
+        with open(args.output, 'wb') as f:
+            f.write(dumps_json_bytes(listings, pretty=True))
         print(f"\nSaved to {args.output}", file=sys.stderr)
 
     if args.save_db and listings:
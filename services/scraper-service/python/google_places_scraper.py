@@ -10,17 +10,150 @@ Usage:
     # Run
     python google_places_scraper.py --city Dakar --type hotel
     python google_places_scraper.py --city Dakar --type lodging --save-db
+    python google_places_scraper.py --all-cities --output hotels.jsonl  # one listing per line
 """
 
 import os
 import sys
 import json
 import time
+import asyncio
+import atexit
+import threading
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Optional
+from urllib.parse import parse_qs, urlsplit
+
+from supabase_upsert import upsert_rows
+
+# Try to import aiohttp for concurrent place details requests
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+    print("[Warning] aiohttp not available, fetching place details sequentially", file=sys.stderr)
+
+# Try to import orjson for faster parsing of the API responses and
+# serialization of the scraped listings
+try:
+    import orjson
+    loads_json = orjson.loads
+
+    def dumps_json_bytes(obj, pretty: bool = False) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if pretty else 0)
+except ImportError:
+    loads_json = json.loads
+
+    def dumps_json_bytes(obj, pretty: bool = False) -> bytes:
+        return json.dumps(obj, indent=2 if pretty else None, ensure_ascii=False).encode()
+
+# Try to import diskcache to keep place details across runs
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
 
 # Google Places API
 GOOGLE_API_KEY = os.environ.get('GOOGLE_PLACES_API_KEY') or os.environ.get('GOOGLE_API_KEY')
+NEARBY_SEARCH_URL = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
+PLACE_DETAILS_URL = "https://maps.googleapis.com/maps/api/place/details/json"
+PLACE_PHOTO_URL = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photo_reference={{}}&key={GOOGLE_API_KEY}"
+PLACE_DETAILS_FIELDS = 'name,formatted_address,formatted_phone_number,international_phone_number,website,url,rating,user_ratings_total,price_level,types,geometry,photos,opening_hours,business_status'
+
+# Max place details requests in flight when aiohttp is available
+MAX_CONCURRENT_DETAILS = 32
+
+# Place ids per scraped_listings lookup (keeps the in.() filter URL short)
+STORED_LOOKUP_SIZE = 200
+
+# Cities scraped at once with --all-cities (details calls stay under the
+# shared rate limit below)
+MAX_CONCURRENT_CITIES = 4
+
+# Place details requests per second, and attempts per place when the
+# API answers OVER_QUERY_LIMIT (or HTTP 429)
+DETAILS_MAX_QPS = 50
+DETAILS_MAX_ATTEMPTS = 5
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart, across threads and tasks"""
+
+    def __init__(self, rate: float):
+        self.interval = 1 / rate
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Claim the next call slot and return the seconds until it opens"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+            return slot - now
+
+    def wait(self):
+        time.sleep(self.reserve())
+
+    async def wait_async(self):
+        await asyncio.sleep(self.reserve())
+
+
+details_limiter = RateLimiter(DETAILS_MAX_QPS)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff before retrying a throttled request"""
+    return min(0.5 * 2 ** attempt, 16)
+
+
+# Place details already fetched, by place_id: in memory for this run
+# (cities' search radii overlap), and on disk for DETAILS_CACHE_TTL seconds
+# when diskcache is available (set GOOGLE_PLACES_CACHE_DIR= to disable)
+DETAILS_CACHE_DIR = os.environ.get('GOOGLE_PLACES_CACHE_DIR', '.places_cache')
+DETAILS_CACHE_TTL = 7 * 86400
+_DETAILS_CACHE = {}
+
+
+@lru_cache(maxsize=1)
+def details_disk_cache():
+    """Disk cache of place details, opened on first use"""
+    if not (DISKCACHE_AVAILABLE and DETAILS_CACHE_DIR):
+        return None
+    cache = diskcache.Cache(DETAILS_CACHE_DIR)
+    atexit.register(cache.close)
+    return cache
+
+
+def cached_place_details(place_id: str) -> Optional[dict]:
+    """Details of a place fetched before, if any"""
+    details = _DETAILS_CACHE.get(place_id)
+    if details is None and details_disk_cache() is not None:
+        details = details_disk_cache().get(place_id)
+        if details is not None:
+            _DETAILS_CACHE[place_id] = details
+    return details
+
+
+def cache_place_details(place_id: str, details: dict):
+    """Remember the details of a place for later lookups"""
+    _DETAILS_CACHE[place_id] = details
+    if details_disk_cache() is not None:
+        details_disk_cache().set(place_id, details, expire=DETAILS_CACHE_TTL)
+
+
+# Shared requests session: keeps connections to maps.googleapis.com alive
+# across search and details calls
+_SESSION = requests.Session()
+_SESSION.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=64))
+atexit.register(_SESSION.close)
 
 # Place types for accommodations
 ACCOMMODATION_TYPES = [
@@ -32,6 +165,16 @@ ACCOMMODATION_TYPES = [
     'campground',        # Campgrounds
 ]
 
+# Property type of a place by its Google types, in order of priority
+# (places with none of them are 'Lodging')
+PROPERTY_TYPES = {
+    'hotel': 'Hotel',
+    'guest_house': 'Auberge',
+    'resort': 'Resort',
+    'motel': 'Motel',
+    'campground': 'Camping',
+}
+
 # Senegal cities to search
 SENEGAL_CITIES = [
     {'name': 'Dakar', 'lat': 14.6937, 'lng': -17.4441},
@@ -54,8 +197,6 @@ def search_places(lat: float, lng: float, place_type: str, radius: int = 10000)
         print("[ERROR] GOOGLE_PLACES_API_KEY not set", file=sys.stderr)
         return []
 
-    url = "https://maps.googleapis.com/maps/api/place/nearbysearch/json"
-
     all_results = []
     next_page_token = None
 
@@ -71,8 +212,8 @@ def search_places(lat: float, lng: float, place_type: str, radius: int = 10000)
             params['pagetoken'] = next_page_token
             time.sleep(2)  # Required delay for pagetoken
 
-        response = requests.get(url, params=params, timeout=30)
-        data = response.json()
+        response = _SESSION.get(NEARBY_SEARCH_URL, params=params, timeout=30)
+        data = loads_json(response.content)
 
         if data.get('status') != 'OK' and data.get('status') != 'ZERO_RESULTS':
             print(f"[ERROR] API error: {data.get('status')} - {data.get('error_message', '')}", file=sys.stderr)
@@ -96,29 +237,149 @@ def get_place_details(place_id: str) -> dict:
     if not GOOGLE_API_KEY:
         return {}
 
-    url = "https://maps.googleapis.com/maps/api/place/details/json"
+    details = cached_place_details(place_id)
+    if details is not None:
+        return details
 
     params = {
         'place_id': place_id,
-        'fields': 'name,formatted_address,formatted_phone_number,international_phone_number,website,url,rating,user_ratings_total,price_level,types,geometry,photos,opening_hours,business_status',
+        'fields': PLACE_DETAILS_FIELDS,
         'key': GOOGLE_API_KEY,
     }
 
-    try:
-        response = requests.get(url, params=params, timeout=60)
-        data = response.json()
+    for attempt in range(DETAILS_MAX_ATTEMPTS):
+        details_limiter.wait()
+        try:
+            response = _SESSION.get(PLACE_DETAILS_URL, params=params, timeout=60)
+            data = {'status': 'OVER_QUERY_LIMIT'} if response.status_code == 429 else loads_json(response.content)
+        except requests.exceptions.Timeout:
+            print(f"  {place_id}: timeout", file=sys.stderr)
+            break
+        except Exception as e:
+            print(f"  {place_id}: err:{e}", file=sys.stderr)
+            break
 
         if data.get('status') == 'OK':
-            return data.get('result', {})
-    except requests.exceptions.Timeout:
-        print("timeout", end=' ', file=sys.stderr)
-    except Exception as e:
-        print(f"err:{e}", end=' ', file=sys.stderr)
+            details = data.get('result', {})
+            cache_place_details(place_id, details)
+            return details
+        if data.get('status') != 'OVER_QUERY_LIMIT':
+            break
+        time.sleep(backoff_delay(attempt))
 
     return {}
 
 
-def normalize_place(place: dict, details: dict, city: str) -> dict:
+async def get_place_details_async(session, sem, place_id: str) -> dict:
+    """Async variant of get_place_details sharing an aiohttp session"""
+    details = cached_place_details(place_id)
+    if details is not None:
+        return details
+
+    params = {
+        'place_id': place_id,
+        'fields': PLACE_DETAILS_FIELDS,
+        'key': GOOGLE_API_KEY,
+    }
+
+    for attempt in range(DETAILS_MAX_ATTEMPTS):
+        await details_limiter.wait_async()
+        async with sem:
+            try:
+                async with session.get(PLACE_DETAILS_URL, params=params,
+                                       timeout=aiohttp.ClientTimeout(total=60)) as response:
+                    if response.status == 429:
+                        data = {'status': 'OVER_QUERY_LIMIT'}
+                    else:
+                        data = loads_json(await response.read())
+            except asyncio.TimeoutError:
+                print(f"  {place_id}: timeout", file=sys.stderr)
+                break
+            except Exception as e:
+                print(f"  {place_id}: err:{e}", file=sys.stderr)
+                break
+
+        if data.get('status') == 'OK':
+            details = data.get('result', {})
+            cache_place_details(place_id, details)
+            return details
+        if data.get('status') != 'OVER_QUERY_LIMIT':
+            break
+        await asyncio.sleep(backoff_delay(attempt))
+
+    return {}
+
+
+async def get_all_place_details_async(place_ids: list) -> list:
+    """Fetch details for several places concurrently, in input order"""
+    if not GOOGLE_API_KEY:
+        return [{} for _ in place_ids]
+
+    sem = asyncio.Semaphore(MAX_CONCURRENT_DETAILS)
+    connector = aiohttp.TCPConnector(limit_per_host=MAX_CONCURRENT_DETAILS)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*(get_place_details_async(session, sem, pid) for pid in place_ids))
+
+
+@lru_cache(maxsize=1)
+def supabase_client():
+    """Supabase client from SUPABASE_URL / SUPABASE_SERVICE_ROLE_KEY, or None if not configured"""
+    supabase_url = os.environ.get('SUPABASE_URL')
+    supabase_key = os.environ.get('SUPABASE_SERVICE_ROLE_KEY')
+    if not supabase_url or not supabase_key:
+        return None
+
+    try:
+        from supabase import create_client
+    except ImportError:
+        return None
+    return create_client(supabase_url, supabase_key)
+
+
+def details_from_row(row: dict) -> dict:
+    """Place details rebuilt from a saved scraped_listings row"""
+    raw_data = row.get('raw_data') or {}
+    photo_refs = [parse_qs(urlsplit(url).query).get('photo_reference', [None])[0] for url in row.get('photos') or []]
+    return {
+        'international_phone_number': raw_data.get('phone'),
+        'website': raw_data.get('website'),
+        'price_level': raw_data.get('price_level'),
+        'business_status': raw_data.get('business_status'),
+        'url': row.get('url'),
+        'formatted_address': row.get('location_text'),
+        'photos': [{'photo_reference': ref} for ref in photo_refs if ref],
+    }
+
+
+def stored_place_details(place_ids: list) -> dict:
+    """Details of the places already saved with a phone number, by place_id
+
+    Their Details calls can be skipped: the saved row has everything a
+    Details response adds to the search result.
+    """
+    supabase = supabase_client()
+    if supabase is None:
+        return {}
+
+    stored = {}
+    try:
+        for start in range(0, len(place_ids), STORED_LOOKUP_SIZE):
+            result = supabase.table('scraped_listings').select(
+                'platform_id, url, location_text, photos, raw_data'
+            ).eq('platform', 'google_places').in_(
+                'platform_id', place_ids[start:start + STORED_LOOKUP_SIZE]
+            ).execute()
+            for row in result.data:
+                if (row.get('raw_data') or {}).get('phone'):
+                    stored[row['platform_id']] = details_from_row(row)
+    except Exception as e:
+        print(f"[Warning] Could not read saved places ({e}), fetching all details", file=sys.stderr)
+        return {}
+
+    return stored
+
+
+def normalize_place(place: dict, details: dict, city: str, scraped_at: str = None) -> dict:
     """Convert Google Places data to our standard format"""
 
     location = place.get('geometry', {}).get('location', {})
@@ -129,23 +390,12 @@ def normalize_place(place: dict, details: dict, city: str) -> dict:
         for photo in details['photos'][:5]:
             photo_ref = photo.get('photo_reference')
             if photo_ref:
-                photo_url = f"https://maps.googleapis.com/maps/api/place/photo?maxwidth=800&photo_reference={photo_ref}&key={GOOGLE_API_KEY}"
-                photos.append(photo_url)
+                photos.append(PLACE_PHOTO_URL.format(photo_ref))
 
     # Determine property type
     types = place.get('types', [])
-    if 'hotel' in types:
-        prop_type = 'Hotel'
-    elif 'guest_house' in types:
-        prop_type = 'Auberge'
-    elif 'resort' in types:
-        prop_type = 'Resort'
-    elif 'motel' in types:
-        prop_type = 'Motel'
-    elif 'campground' in types:
-        prop_type = 'Camping'
-    else:
-        prop_type = 'Lodging'
+    type_set = set(types)
+    prop_type = next((label for ptype, label in PROPERTY_TYPES.items() if ptype in type_set), 'Lodging')
 
     return {
         'platform': 'google_places',
@@ -169,17 +419,25 @@ def normalize_place(place: dict, details: dict, city: str) -> dict:
         'business_status': details.get('business_status'),
         'is_open': details.get('opening_hours', {}).get('open_now'),
         'types': types,
-        'scraped_at': datetime.now().isoformat(),
+        'scraped_at': scraped_at or datetime.now().isoformat(),
     }
 
 
-def scrape_city(city_name: str, lat: float, lng: float, place_types: list = None, get_details: bool = True) -> list:
-    """Scrape all accommodations in a city"""
+def scrape_city(city_name: str, lat: float, lng: float, place_types: list = None, get_details: bool = True,
+                reuse_saved: bool = True) -> list:
+    """Scrape all accommodations in a city
+
+    With reuse_saved, places already saved with a phone number keep their
+    saved details instead of being looked up again.
+    """
 
     if place_types is None:
         place_types = ACCOMMODATION_TYPES
 
-    all_places = {}
+    # Unique places in first-seen order, with their ids
+    places = []
+    place_ids = []
+    seen = set()
 
     for ptype in place_types:
         print(f"\n[{city_name}] Searching {ptype}...", file=sys.stderr)
@@ -187,30 +445,55 @@ def scrape_city(city_name: str, lat: float, lng: float, place_types: list = None
 
         for place in results:
             pid = place.get('place_id')
-            if pid and pid not in all_places:
-                all_places[pid] = place
+            if pid and pid not in seen:
+                seen.add(pid)
+                places.append(place)
+                place_ids.append(pid)
 
-    print(f"\n[{city_name}] Found {len(all_places)} unique places", file=sys.stderr)
+    print(f"\n[{city_name}] Found {len(places)} unique places", file=sys.stderr)
 
     # Get details with phone numbers
+    stored = stored_place_details(place_ids) if get_details and reuse_saved else {}
+    fetch_ids = [pid for pid in place_ids if pid not in stored]
+    if stored:
+        print(f"[{city_name}] Reusing saved details for {len(stored)} places", file=sys.stderr)
+
+    if get_details and AIOHTTP_AVAILABLE:
+        print(f"[{city_name}] Getting details for {len(fetch_ids)} places concurrently...", file=sys.stderr)
+        fetched = asyncio.run(get_all_place_details_async(fetch_ids))
+    elif get_details:
+        print(f"[{city_name}] Getting details for {len(fetch_ids)} places...", file=sys.stderr)
+        fetched = [get_place_details(pid) for pid in fetch_ids]
+    else:
+        fetched = [{} for _ in fetch_ids]
+
+    fetched = dict(zip(fetch_ids, fetched))
+    all_details = [stored.get(pid) or fetched[pid] for pid in place_ids]
+
     listings = []
+    scraped_at = datetime.now().isoformat()  # One timestamp for the whole city
 
-    for i, (pid, place) in enumerate(all_places.items()):
+    for i, (place, details) in enumerate(zip(places, all_details)):
         if get_details:
-            print(f"  [{i+1}/{len(all_places)}] Getting details...", end=' ', file=sys.stderr)
-            details = get_place_details(pid)
             phone = details.get('international_phone_number') or details.get('formatted_phone_number')
-            print(f"📞 {phone}" if phone else "No phone", file=sys.stderr)
-            time.sleep(0.1)  # Rate limiting
-        else:
-            details = {}
+            print(f"  [{i+1}/{len(place_ids)}] " + (f"📞 {phone}" if phone else "No phone"), file=sys.stderr)
 
-        listing = normalize_place(place, details, city_name)
+        listing = normalize_place(place, details, city_name, scraped_at)
         listings.append(listing)
 
     return listings
 
 
+def scrape_cities(cities: list, place_types: list = None, get_details: bool = True,
+                  reuse_saved: bool = True) -> list:
+    """Scrape several cities concurrently, one thread per city, listings in city order"""
+    def scrape(city):
+        return scrape_city(city['name'], city['lat'], city['lng'], place_types, get_details, reuse_saved)
+
+    with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_CITIES) as pool:
+        return [listing for listings in pool.map(scrape, cities) for listing in listings]
+
+
 def save_to_supabase(listings: list):
     """Save listings to Supabase database"""
     try:
@@ -228,7 +511,8 @@ def save_to_supabase(listings: list):
 
     supabase = create_client(supabase_url, supabase_key)
 
-    saved = 0
+    rows = []
+    last_seen_at = datetime.now(timezone.utc).isoformat()
     for listing in listings:
         try:
             data = {
@@ -258,21 +542,18 @@ def save_to_supabase(listings: list):
                     'business_status': listing.get('business_status'),
                     'types': listing.get('types'),
                 },
-                'last_seen_at': datetime.now().isoformat(),
+                'last_seen_at': last_seen_at,
             }
 
             # Remove None values
             data = {k: v for k, v in data.items() if v is not None}
-
-            supabase.table('scraped_listings').upsert(
-                data,
-                on_conflict='platform,platform_id'
-            ).execute()
-            saved += 1
+            rows.append(data)
 
         except Exception as e:
             print(f"[ERROR] Failed to save {listing.get('title')}: {e}", file=sys.stderr)
 
+    saved = len(upsert_rows(supabase, 'scraped_listings', rows))
+
     print(f"[Supabase] Saved {saved}/{len(listings)} listings", file=sys.stderr)
     return True
 
@@ -286,6 +567,8 @@ if __name__ == '__main__':
                         help='Place type to search')
     parser.add_argument('--all-cities', action='store_true', help='Scrape all Senegal cities')
     parser.add_argument('--no-details', action='store_true', help='Skip getting details (faster but no phone)')
+    parser.add_argument('--refresh-details', action='store_true',
+                        help='Get details even for places already saved with a phone')
     parser.add_argument('--output', default='hotels.json', help='Output file')
     parser.add_argument('--save-db', action='store_true', help='Save to Supabase database')
 
@@ -306,10 +589,8 @@ if __name__ == '__main__':
     all_listings = []
 
     if args.all_cities:
-        for city in SENEGAL_CITIES:
-            listings = scrape_city(city['name'], city['lat'], city['lng'],
-                                   place_types, get_details=not args.no_details)
-            all_listings.extend(listings)
+        all_listings = scrape_cities(SENEGAL_CITIES, place_types, get_details=not args.no_details,
+                                     reuse_saved=not args.refresh_details)
     else:
         # Find city coordinates
         city_data = next((c for c in SENEGAL_CITIES if c['name'].lower() == args.city.lower()), None)
@@ -319,19 +600,22 @@ if __name__ == '__main__':
             # Default to Dakar
             lat, lng = 14.6937, -17.4441
 
-        all_listings = scrape_city(args.city, lat, lng, place_types, get_details=not args.no_details)
+        all_listings = scrape_city(args.city, lat, lng, place_types, get_details=not args.no_details,
+                                   reuse_saved=not args.refresh_details)
+
+    # Summary: listings with a phone and counts by type, in one pass
+    with_phone = []
+    by_type = Counter()
+    for l in all_listings:
+        by_type[l.get('property_type', 'Unknown')] += 1
+        if l.get('phone'):
+            with_phone.append(l)
 
-    # Summary
-    with_phone = [l for l in all_listings if l.get('phone')]
     print(f"\n{'='*50}", file=sys.stderr)
     print(f"Total places found: {len(all_listings)}", file=sys.stderr)
     print(f"With phone number: {len(with_phone)} ({len(with_phone)*100//max(len(all_listings),1)}%)", file=sys.stderr)
 
     # By type
-    by_type = {}
-    for l in all_listings:
-        t = l.get('property_type', 'Unknown')
-        by_type[t] = by_type.get(t, 0) + 1
     print("\nBy type:", file=sys.stderr)
     for t, c in sorted(by_type.items(), key=lambda x: -x[1]):
         print(f"  {t}: {c}", file=sys.stderr)
@@ -342,9 +626,13 @@ if __name__ == '__main__':
         for l in with_phone[:5]:
             print(f"  📞 {l['phone']} - {l['title']}", file=sys.stderr)
 
-    # Save to file
-    with open(args.output, 'w', encoding='utf-8') as f:
-        json.dump(all_listings, f, indent=2, ensure_ascii=False)
+    # Save to file (one listing per line for a .jsonl output)
+    with open(args.output, 'wb') as f:
+        if args.output.endswith('.jsonl'):
+            for listing in all_listings:
+                f.write(dumps_json_bytes(listing) + b'\n')
+        else:
+            f.write(dumps_json_bytes(all_listings, pretty=True))
     print(f"\nSaved to {args.output}", file=sys.stderr)
 
     # Save to database
@@ -14,25 +14,47 @@ from typing import Optional
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'venv', 'lib', 'python3.11', 'site-packages'))
 
+from supabase_upsert import upsert_rows
+
+# Try to import pandas for vectorized phone extraction
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    PANDAS_AVAILABLE = False
+    print("[Warning] pandas not available, extracting phones listing by listing", file=sys.stderr)
+
+# Try to import pyarrow to keep the pandas phone columns as Arrow strings
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Phone normalization (normalize_phone): non-digits to strip, then an
+# optional 00221 / 221 / 0 prefix before a 9 digit number starting with 7 or 3
+_RE_NON_DIGIT = re.compile(r'\D+')
+_RE_SENEGAL_PHONE = re.compile(r'(?:00221|221|0)?([37]\d{8})')
+
+# raw_data fields that may hold a listing's phone, in order of preference
+PHONE_FIELDS = ['phone', 'phoneNumber', 'whatsapp', 'contact_phone']
+
+# Phones per detected_owners lookup (keeps the in.() filter URL short)
+PHONE_LOOKUP_SIZE = 200
+
 
 def normalize_phone(phone: str) -> Optional[str]:
     """Normalize phone to +221XXXXXXXXX format"""
     if not phone:
         return None
 
-    digits = ''.join(c for c in str(phone) if c.isdigit())
+    digits = _RE_NON_DIGIT.sub('', str(phone))
 
-    # Remove leading zeros or country codes
-    if digits.startswith('00221'):
-        digits = digits[5:]
-    elif digits.startswith('221'):
-        digits = digits[3:]
-    elif digits.startswith('0'):
-        digits = digits[1:]
-
-    # Valid Senegalese numbers: 9 digits starting with 7 or 3
-    if len(digits) == 9 and (digits.startswith('7') or digits.startswith('3')):
-        return f"+221{digits}"
+    # Valid Senegalese numbers: 9 digits starting with 7 or 3, after any
+    # leading zero or country code
+    match = _RE_SENEGAL_PHONE.fullmatch(digits)
+    if match:
+        return f"+221{match.group(1)}"
 
     return None
 
@@ -42,8 +64,7 @@ def extract_phone_from_listing(listing: dict) -> Optional[str]:
     raw_data = listing.get('raw_data') or {}
 
     # Try multiple phone fields
-    phone_fields = ['phone', 'phoneNumber', 'whatsapp', 'contact_phone']
-    for field in phone_fields:
+    for field in PHONE_FIELDS:
         phone = raw_data.get(field)
         if phone:
             normalized = normalize_phone(phone)
@@ -53,33 +74,44 @@ def extract_phone_from_listing(listing: dict) -> Optional[str]:
     return None
 
 
-def detect_owners(supabase) -> dict:
+def extract_phones_pandas(listings: list) -> list:
+    """Normalized phone of each listing, as extract_phone_from_listing, with pandas string ops
+
+    With pyarrow the digit stripping and matching run on Arrow-backed
+    strings rather than Python objects.
     """
-    Main owner detection algorithm
+    string_dtype = 'string[pyarrow]' if PYARROW_AVAILABLE else 'string'
+    raws = [listing.get('raw_data') or {} for listing in listings]
+    phones = pd.Series([None] * len(listings), dtype=object)
 
-    Groups listings by:
-    1. Phone number (Expat-Dakar, local sites)
-    2. Host ID (Airbnb, Booking)
-    3. Email (if available)
+    for field in PHONE_FIELDS:
+        values = pd.Series([raw.get(field) for raw in raws], dtype=object)
+        values = values[values.map(bool) & phones.isna()]
+        if values.empty:
+            continue
+        digits = values.astype(str).astype(string_dtype).str.replace(_RE_NON_DIGIT.pattern, '', regex=True)
+        numbers = digits.str.extract(f'^{_RE_SENEGAL_PHONE.pattern}$', expand=False)
+        phones = phones.fillna('+221' + numbers)
 
-    Returns stats about detected owners
-    """
-    print("\n[Owner Detection] Starting analysis...", file=sys.stderr)
+    return phones.astype(object).where(phones.notna(), None).tolist()
 
-    # Fetch all active listings
-    result = supabase.table('scraped_listings').select('*').eq('is_active', True).execute()
-    listings = result.data
 
-    print(f"[Owner Detection] Analyzing {len(listings)} listings", file=sys.stderr)
+def extract_phones(listings: list) -> list:
+    """Normalized phone of each listing (None when it has none)"""
+    if PANDAS_AVAILABLE and listings:
+        return extract_phones_pandas(listings)
+    return [extract_phone_from_listing(listing) for listing in listings]
 
+
+def group_listings(listings: list) -> list:
+    """Group listings into owner groups, by phone then by host_id"""
     # Group by phone number
     by_phone = defaultdict(list)
     # Group by host_id (platform:id format)
     by_host_id = defaultdict(list)
 
-    for listing in listings:
-        # Extract phone
-        phone = extract_phone_from_listing(listing)
+    for listing, phone in zip(listings, extract_phones(listings)):
+        # Group by phone
         if phone:
             by_phone[phone].append(listing)
 
@@ -108,21 +140,60 @@ def detect_owners(supabase) -> dict:
 
     # Process host_id-based groups (only if not already grouped by phone)
     for host_key, host_listings in by_host_id.items():
-        # Check if these listings are already in a phone group
-        listing_ids = [l['id'] for l in host_listings]
-        new_ids = [lid for lid in listing_ids if lid not in processed_listing_ids]
-
-        if new_ids:
-            # Filter to only new listings
-            new_listings = [l for l in host_listings if l['id'] in new_ids]
-            if new_listings:
-                owner_groups.append({
-                    'match_type': 'host_id',
-                    'identifier': host_key,
-                    'listings': new_listings,
-                    'listing_ids': new_ids,
-                })
-                processed_listing_ids.update(new_ids)
+        # Filter to only listings not already in a phone group (one set
+        # lookup per listing, rather than scanning the id list for each)
+        new_listings = [l for l in host_listings if l['id'] not in processed_listing_ids]
+
+        if new_listings:
+            new_ids = [l['id'] for l in new_listings]
+            owner_groups.append({
+                'match_type': 'host_id',
+                'identifier': host_key,
+                'listings': new_listings,
+                'listing_ids': new_ids,
+            })
+            processed_listing_ids.update(new_ids)
+
+    return owner_groups
+
+
+def fetch_listing_groups(supabase) -> list:
+    """Fetch owner groups already aggregated by the database (migration 00016)"""
+    owner_groups = supabase.rpc('get_listing_groups').execute().data
+    for group in owner_groups:
+        group['listing_ids'] = [l['id'] for l in group['listings']]
+    return owner_groups
+
+
+def detect_owners(supabase) -> dict:
+    """
+    Main owner detection algorithm
+
+    Groups listings by:
+    1. Phone number (Expat-Dakar, local sites)
+    2. Host ID (Airbnb, Booking)
+    3. Email (if available)
+
+    Grouping runs in the database when its get_listing_groups function is
+    available, otherwise over every active listing fetched here.
+
+    Returns stats about detected owners
+    """
+    print("\n[Owner Detection] Starting analysis...", file=sys.stderr)
+
+    try:
+        owner_groups = fetch_listing_groups(supabase)
+    except Exception as e:
+        print(f"[Warning] Owner grouping function unavailable ({e}), grouping listings locally", file=sys.stderr)
+
+        # Fetch all active listings
+        result = supabase.table('scraped_listings').select(
+            'id, platform, host_id, host_name, price, raw_data'
+        ).eq('is_active', True).execute()
+        listings = result.data
+
+        print(f"[Owner Detection] Analyzing {len(listings)} listings", file=sys.stderr)
+        owner_groups = group_listings(listings)
 
     print(f"[Owner Detection] Found {len(owner_groups)} owner groups", file=sys.stderr)
 
@@ -132,6 +203,36 @@ def detect_owners(supabase) -> dict:
     return stats
 
 
+def fetch_owner_ids_by_phone(supabase, phones: list) -> dict:
+    """Map primary_phone -> id of the detected owners already saved for these phones"""
+    owner_ids = {}
+    for start in range(0, len(phones), PHONE_LOOKUP_SIZE):
+        result = supabase.table('detected_owners').select('id, primary_phone').in_(
+            'primary_phone', phones[start:start + PHONE_LOOKUP_SIZE]
+        ).execute()
+        for row in result.data:
+            owner_ids.setdefault(row['primary_phone'], row['id'])
+    return owner_ids
+
+
+def calculate_risk_scores(supabase, owner_ids: list):
+    """Recalculate the risk scores of the saved owners in one call (migration 00017)"""
+    if not owner_ids:
+        return
+
+    try:
+        supabase.rpc('calculate_owner_risk_scores', {'owner_ids_param': owner_ids}).execute()
+        return
+    except Exception as e:
+        print(f"[Warning] Batch risk scoring unavailable ({e}), scoring owners one by one", file=sys.stderr)
+
+    for owner_id in owner_ids:
+        try:
+            supabase.rpc('calculate_owner_risk_score', {'owner_id_param': owner_id}).execute()
+        except Exception as e:
+            print(f"[Owner Detection] Error scoring owner {owner_id}: {e}", file=sys.stderr)
+
+
 def save_owners_to_db(supabase, owner_groups: list) -> dict:
     """Save detected owners to database"""
     stats = {
@@ -140,6 +241,14 @@ def save_owners_to_db(supabase, owner_groups: list) -> dict:
         'new_owners': 0,
         'updated_owners': 0,
     }
+    links = []
+    owner_ids = []
+    now = datetime.now().isoformat()  # One timestamp for the whole save
+
+    existing_ids = fetch_owner_ids_by_phone(supabase, [
+        group['identifier'] for group in owner_groups
+        if group['match_type'] == 'phone' and group['identifier']
+    ])
 
     for group in owner_groups:
         try:
@@ -179,8 +288,8 @@ def save_owners_to_db(supabase, owner_groups: list) -> dict:
 
             # Build owner record
             owner_data = {
-                'names': list(names) if names else [],
-                'host_ids': list(host_ids) if host_ids else [],
+                'names': list(names),
+                'host_ids': list(host_ids),
                 'platforms': list(platforms),
                 'listing_count': len(listings),
                 'active_listing_count': len(listings),
@@ -188,7 +297,7 @@ def save_owners_to_db(supabase, owner_groups: list) -> dict:
                 'registered_count': 0,
                 'avg_price_per_night': avg_price,
                 'estimated_monthly_revenue': estimated_monthly,
-                'last_seen_at': datetime.now().isoformat(),
+                'last_seen_at': now,
             }
 
             # Set primary identifier
@@ -198,40 +307,31 @@ def save_owners_to_db(supabase, owner_groups: list) -> dict:
                 platform, hid = identifier.split(':', 1)
                 # Store the first host_id as reference
 
-            # Check if owner exists (by phone or host_id)
-            existing = None
-            if match_type == 'phone' and identifier:
-                existing_result = supabase.table('detected_owners').select('id').eq('primary_phone', identifier).execute()
-                if existing_result.data:
-                    existing = existing_result.data[0]
+            # Check if owner exists (by phone)
+            owner_id = existing_ids.get(identifier) if match_type == 'phone' else None
 
-            if existing:
+            if owner_id:
                 # Update existing owner
-                supabase.table('detected_owners').update(owner_data).eq('id', existing['id']).execute()
-                owner_id = existing['id']
+                supabase.table('detected_owners').update(owner_data).eq('id', owner_id).execute()
                 stats['updated_owners'] += 1
             else:
                 # Create new owner
-                owner_data['first_seen_at'] = datetime.now().isoformat()
+                owner_data['first_seen_at'] = now
                 result = supabase.table('detected_owners').insert(owner_data).execute()
                 owner_id = result.data[0]['id']
                 stats['new_owners'] += 1
 
-            # Link listings to owner
-            for listing in listings:
-                link_data = {
-                    'owner_id': owner_id,
-                    'scraped_listing_id': listing['id'],
-                    'match_type': match_type,
-                    'confidence': 1.0 if match_type == 'phone' else 0.9,
-                }
-                supabase.table('owner_listings').upsert(
-                    link_data,
-                    on_conflict='owner_id,scraped_listing_id'
-                ).execute()
-
-            # Calculate risk score
-            supabase.rpc('calculate_owner_risk_score', {'owner_id_param': owner_id}).execute()
+            # Link listings to owner (upserted in batches once every owner is saved)
+            confidence = 1.0 if match_type == 'phone' else 0.9
+            links.extend({
+                'owner_id': owner_id,
+                'scraped_listing_id': listing['id'],
+                'match_type': match_type,
+                'confidence': confidence,
+            } for listing in listings)
+
+            # Risk score calculated once every owner is saved
+            owner_ids.append(owner_id)
 
             stats['total_owners'] += 1
             if len(listings) > 1:
@@ -240,6 +340,9 @@ def save_owners_to_db(supabase, owner_groups: list) -> dict:
         except Exception as e:
             print(f"[Owner Detection] Error saving owner: {e}", file=sys.stderr)
 
+    upsert_rows(supabase, 'owner_listings', links, on_conflict='owner_id,scraped_listing_id')
+    calculate_risk_scores(supabase, owner_ids)
+
     return stats
 
 
@@ -7,11 +7,88 @@ Run after adding google_places enum value.
 import os
 import sys
 import json
-from datetime import datetime
+from datetime import datetime, timezone
+from itertools import islice
+
+from supabase_upsert import MAX_CONCURRENT_UPSERTS, UPSERT_BATCH_SIZE, create_pooled_client, upsert_rows
+
+# Try to import ijson to stream hotels_senegal.json instead of loading it whole
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except ImportError:
+    IJSON_AVAILABLE = False
+
+# Try to import orjson for faster parsing of the whole file when ijson is missing
+try:
+    import orjson
+    loads_json = orjson.loads
+except ImportError:
+    loads_json = json.loads
+
+# Hotels read and upserted at a time: enough for a full round of concurrent batches
+HOTELS_PER_CHUNK = UPSERT_BATCH_SIZE * MAX_CONCURRENT_UPSERTS
+
+# Chunks that may fail to save any hotel before the run stops
+MAX_FAILED_CHUNKS = 3
+
+# Hotel fields build_row needs, hotels missing any are counted as errors
+REQUIRED_FIELDS = frozenset(('platform_id', 'url', 'title'))
+
+# scraped_listings columns copied from hotel fields when not None: (column, field)
+HOTEL_COLUMNS = (
+    ('description', 'description'),
+    ('price', 'price'),
+    ('currency', 'currency'),
+    ('location_text', 'location_text'),
+    ('city', 'city'),
+    ('latitude', 'latitude'),
+    ('longitude', 'longitude'),
+    ('rating', 'rating'),
+    ('num_reviews', 'num_reviews'),
+)
+
+# Hotel fields kept in the raw_data column
+RAW_DATA_FIELDS = ('phone', 'website', 'property_type', 'price_level', 'business_status', 'types')
+
+
+def iter_hotels(json_path: str):
+    """Hotels of a JSON array file, streamed one at a time when ijson is available"""
+    if IJSON_AVAILABLE:
+        with open(json_path, 'rb') as f:
+            yield from ijson.items(f, 'item', use_float=True)
+    else:
+        with open(json_path, 'rb') as f:
+            yield from loads_json(f.read())
+
+
+def build_row(hotel: dict, last_seen_at: str) -> dict:
+    """scraped_listings row for a hotel from hotels_senegal.json"""
+    row = {
+        'platform': 'google_places',
+        'platform_id': hotel['platform_id'],
+        'url': hotel['url'],
+        'title': hotel['title'],
+        'amenities': [],
+        'raw_data': {field: hotel.get(field) for field in RAW_DATA_FIELDS},
+        'last_seen_at': last_seen_at,
+    }
+
+    # None values are left out rather than added and filtered
+    for column, field in HOTEL_COLUMNS:
+        value = hotel.get(field)
+        if value is not None:
+            row[column] = value
+
+    photos = hotel.get('photos', [])
+    if photos is not None:
+        row['photos'] = photos
+    return row
+
 
 def save_hotels():
     try:
-        from supabase import create_client
+        import supabase  # noqa: F401
     except ImportError:
         print("[ERROR] Run: pip install supabase")
         return False
@@ -23,77 +100,54 @@ def save_hotels():
         print("[ERROR] Set SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY")
         return False
 
-    # Load hotels
-    json_path = os.path.join(os.path.dirname(__file__), 'hotels_senegal.json')
-    with open(json_path, 'r', encoding='utf-8') as f:
-        hotels = json.load(f)
-
-    print(f"Loaded {len(hotels)} hotels")
+    supabase = create_pooled_client(supabase_url, supabase_key)
 
-    supabase = create_client(supabase_url, supabase_key)
+    # Hotels are read and saved a chunk at a time, so only one chunk of
+    # rows is held in memory
+    json_path = os.path.join(os.path.dirname(__file__), 'hotels_senegal.json')
+    hotels = iter_hotels(json_path)
 
+    loaded = 0
     saved = 0
     errors = 0
+    failed_chunks = 0
+    last_seen_at = datetime.now(timezone.utc).isoformat()
 
-    for hotel in hotels:
-        try:
-            data = {
-                'platform': 'google_places',
-                'platform_id': hotel['platform_id'],
-                'url': hotel['url'],
-                'title': hotel['title'],
-                'description': hotel.get('description'),
-                'price': hotel.get('price'),
-                'currency': hotel.get('currency'),
-                'location_text': hotel.get('location_text'),
-                'city': hotel.get('city'),
-                'latitude': hotel.get('latitude'),
-                'longitude': hotel.get('longitude'),
-                'host_name': None,
-                'num_rooms': None,
-                'num_guests': None,
-                'photos': hotel.get('photos', []),
-                'amenities': [],
-                'rating': hotel.get('rating'),
-                'num_reviews': hotel.get('num_reviews'),
-                'raw_data': {
-                    'phone': hotel.get('phone'),
-                    'website': hotel.get('website'),
-                    'property_type': hotel.get('property_type'),
-                    'price_level': hotel.get('price_level'),
-                    'business_status': hotel.get('business_status'),
-                    'types': hotel.get('types'),
-                },
-                'last_seen_at': datetime.now().isoformat(),
-            }
-
-            # Remove None values
-            data = {k: v for k, v in data.items() if v is not None}
-
-            supabase.table('scraped_listings').upsert(
-                data,
-                on_conflict='platform,platform_id'
-            ).execute()
-            saved += 1
-
-            if saved % 50 == 0:
-                print(f"  Saved {saved}...")
+    while chunk := list(islice(hotels, HOTELS_PER_CHUNK)):
+        loaded += len(chunk)
+        rows = [build_row(hotel, last_seen_at) for hotel in chunk if REQUIRED_FIELDS <= hotel.keys()]
+        errors += len(chunk) - len(rows)
 
+        # Batched upserts share the client's connection instead of one request per hotel
+        try:
+            chunk_saved = len(upsert_rows(supabase, 'scraped_listings', rows))
         except Exception as e:
             print(f"Error: {e}")
-            errors += 1
-            if errors > 5:
-                print("Too many errors, stopping")
-                break
-
+            chunk_saved = 0
+        # upsert_rows absorbs failures itself, so a chunk failed when none of it was saved
+        if rows and not chunk_saved:
+            failed_chunks += 1
+        saved += chunk_saved
+        errors += len(rows) - chunk_saved
+        if os.environ.get('VERBOSE'):
+            print(f"  Saved {saved}/{loaded} hotels...")
+        if failed_chunks >= MAX_FAILED_CHUNKS:
+            print(f"[ERROR] {failed_chunks} chunks failed, stopping")
+            break
+
+    print(f"Loaded {loaded} hotels")
     print(f"\n=== RESULTS ===")
     print(f"Hotels saved: {saved}")
     print(f"Errors: {errors}")
 
-    # Get total count
+    # Get total count, estimated from the table statistics rather than counted
     try:
-        result = supabase.table('scraped_listings').select('platform', count='exact').execute()
-        print(f"Total listings in DB: {result.count}")
+        try:
+            total = supabase.rpc('approx_row_count', {'tbl': 'scraped_listings'}).execute().data
+        except Exception as e:
+            print(f"[Warning] approx_row_count unavailable ({e}), counting listings exactly")
+            total = supabase.table('scraped_listings').select('platform', count='exact').execute().count
+        print(f"Total listings in DB: {total}")
     except:
         pass
 
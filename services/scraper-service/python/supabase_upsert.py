@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Batched upserts into Supabase tables
+Shared by the scrapers' save_to_supabase functions
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import asyncio
+
+# Try to import aiohttp to send batches concurrently straight to PostgREST
+try:
+    import aiohttp
+    AIOHTTP_AVAILABLE = True
+except ImportError:
+    AIOHTTP_AVAILABLE = False
+
+# Try to import orjson to serialize the rows sent to PostgREST or COPY faster
+try:
+    import orjson
+
+    def dumps_json_bytes(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+except ImportError:
+    def dumps_json_bytes(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# Try to import httpx (the supabase client's HTTP library) to tell its
+# connection errors apart, and h2 for a pooled HTTP/2 supabase client
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = HTTPX_AVAILABLE
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Try to import psycopg2 to upsert over a direct Postgres connection
+try:
+    import psycopg2
+    from psycopg2 import sql
+    from psycopg2.extras import Json, execute_values
+    PSYCOPG2_AVAILABLE = True
+except ImportError:
+    PSYCOPG2_AVAILABLE = False
+
+# Rows per bulk upsert request
+UPSERT_BATCH_SIZE = 500
+
+# Max upsert requests in flight when aiohttp is available
+MAX_CONCURRENT_UPSERTS = 10
+
+# Attempts per upsert request or statement before its batch or row counts as failed
+UPSERT_MAX_ATTEMPTS = 3
+
+# Temp table batches are copied into before being merged over a direct Postgres connection
+STAGING_TABLE = 'upsert_staging'
+
+# Connections kept by the pooled supabase client, and its request timeout
+# (the supabase client's default PostgREST timeout)
+CLIENT_MAX_CONNECTIONS = 32
+CLIENT_TIMEOUT = 120
+
+
+def create_pooled_client(supabase_url: str, supabase_key: str):
+    """Supabase client whose requests share one keep-alive HTTP/2 connection pool
+
+    Falls back to the default client when h2 is not installed or the
+    installed supabase version does not accept a custom httpx client.
+    """
+    from supabase import create_client
+
+    if HTTP2_AVAILABLE:
+        try:
+            from supabase import ClientOptions
+            http_client = httpx.Client(
+                http2=True,
+                timeout=CLIENT_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=CLIENT_MAX_CONNECTIONS,
+                    max_keepalive_connections=CLIENT_MAX_CONNECTIONS,
+                ),
+            )
+            return create_client(supabase_url, supabase_key, options=ClientOptions(httpx_client=http_client))
+        except (ImportError, TypeError):
+            pass
+
+    return create_client(supabase_url, supabase_key)
+
+
+def plan_batches(rows: list, key_columns: list) -> list:
+    """Split rows into upsert batches of (data, input indices) pairs
+
+    Rows that share a conflict key are merged first (later values win), the
+    way consecutive single upserts would apply, since one bulk upsert cannot
+    touch the same row twice. Rows are then grouped by column set: a bulk
+    upsert sets absent columns to NULL, which would wipe values a single-row
+    upsert leaves untouched.
+    """
+    merged = {}
+    for index, data in enumerate(rows):
+        key = tuple(data.get(column) for column in key_columns)
+        if key in merged:
+            merged[key][0].update(data)
+            merged[key][1].append(index)
+        else:
+            merged[key] = (dict(data), [index])
+    if len(merged) < len(rows):
+        print(f"[Supabase] Merged {len(rows) - len(merged)} duplicate rows by {','.join(key_columns)}", file=sys.stderr)
+
+    groups = {}
+    for data, indices in merged.values():
+        groups.setdefault(frozenset(data), []).append((data, indices))
+
+    return [
+        group[start:start + UPSERT_BATCH_SIZE]
+        for group in groups.values()
+        for start in range(0, len(group), UPSERT_BATCH_SIZE)
+    ]
+
+
+def row_label(data: dict, key_columns: list) -> str:
+    """Conflict key of a row, for error messages"""
+    return ','.join(str(data.get(column)) for column in key_columns)
+
+
+def backoff_delay(attempt: int) -> float:
+    """Exponential backoff before retrying a failed request"""
+    return min(0.5 * 2 ** attempt, 5)
+
+
+def is_transient(error: Exception) -> bool:
+    """Whether a failed upsert is worth retrying: a connection error, a
+    timeout or a 5xx response, rather than a problem with the rows"""
+    if HTTPX_AVAILABLE and isinstance(error, httpx.TransportError):
+        return True
+    # Deadlocks, serialization failures, statement timeouts and lost
+    # connections (InterfaceError once psycopg2 finds the connection closed)
+    if PSYCOPG2_AVAILABLE and isinstance(error, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+        return True
+    # postgrest's APIError carries the HTTP status as its code when the body is not JSON
+    code = str(getattr(error, 'code', ''))
+    return len(code) == 3 and code.startswith('5')
+
+
+def with_retries(upsert):
+    """Call upsert, retrying transient failures with backoff up to UPSERT_MAX_ATTEMPTS attempts"""
+    for attempt in range(UPSERT_MAX_ATTEMPTS):
+        if attempt:
+            time.sleep(backoff_delay(attempt - 1))
+        try:
+            return upsert()
+        except Exception as e:
+            if attempt == UPSERT_MAX_ATTEMPTS - 1 or not is_transient(e):
+                raise
+
+
+def upsert_batches(supabase, table: str, batches: list, on_conflict: str) -> list:
+    """Send batches one after another through the supabase client, retrying transient failures"""
+    key_columns = on_conflict.split(',')
+    saved = []
+
+    # One request builder for the table, each upsert() starts a fresh request from it
+    table_query = supabase.table(table)
+    for batch in batches:
+        try:
+            with_retries(table_query.upsert(
+                [data for data, _ in batch],
+                on_conflict=on_conflict
+            ).execute)
+            for _, indices in batch:
+                saved.extend(indices)
+        except Exception as e:
+            print(f"[Supabase] Batch upsert failed ({e}), retrying {len(batch)} rows individually", file=sys.stderr)
+            for data, indices in batch:
+                try:
+                    with_retries(table_query.upsert(
+                        data,
+                        on_conflict=on_conflict
+                    ).execute)
+                    saved.extend(indices)
+                except Exception as e:
+                    print(f"[ERROR] Failed to save {row_label(data, key_columns)}: {e}", file=sys.stderr)
+
+    return saved
+
+
+async def post_upsert(session, sem, endpoint: str, payload) -> None:
+    """POST one upsert to PostgREST, raising on an error response
+
+    Connection errors, timeouts and 5xx responses are transient and retried
+    with backoff, up to UPSERT_MAX_ATTEMPTS attempts.
+    """
+    body = dumps_json_bytes(payload)
+    for attempt in range(UPSERT_MAX_ATTEMPTS):
+        if attempt:
+            await asyncio.sleep(backoff_delay(attempt - 1))
+        try:
+            async with sem:
+                async with session.post(endpoint, data=body) as response:
+                    if response.status < 300:
+                        return
+                    error = RuntimeError(f"HTTP {response.status}: {await response.text()}")
+                    if response.status < 500:
+                        raise error
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error = e
+    raise error
+
+
+async def upsert_batch_async(session, sem, endpoint: str, batch: list, key_columns: list) -> list:
+    """Upsert one batch, retrying its rows individually if the batch fails"""
+    try:
+        await post_upsert(session, sem, endpoint, [data for data, _ in batch])
+        return [index for _, indices in batch for index in indices]
+    except Exception as e:
+        print(f"[Supabase] Batch upsert failed ({e}), retrying {len(batch)} rows individually", file=sys.stderr)
+
+    results = await asyncio.gather(
+        *(post_upsert(session, sem, endpoint, data) for data, _ in batch),
+        return_exceptions=True,
+    )
+    saved = []
+    for (data, indices), result in zip(batch, results):
+        if isinstance(result, Exception):
+            print(f"[ERROR] Failed to save {row_label(data, key_columns)}: {result}", file=sys.stderr)
+        else:
+            saved.extend(indices)
+    return saved
+
+
+async def upsert_batches_async(supabase_url: str, supabase_key: str, table: str,
+                               batches: list, on_conflict: str) -> list:
+    """Send batches concurrently to the PostgREST endpoint of the table"""
+    endpoint = f"{supabase_url.rstrip('/')}/rest/v1/{table}?on_conflict={on_conflict}"
+    headers = {
+        'apikey': supabase_key,
+        'Authorization': f"Bearer {supabase_key}",
+        'Prefer': 'resolution=merge-duplicates,return=minimal',
+        'Content-Type': 'application/json',
+    }
+    key_columns = on_conflict.split(',')
+    sem = asyncio.Semaphore(MAX_CONCURRENT_UPSERTS)
+    connector = aiohttp.TCPConnector(limit=MAX_CONCURRENT_UPSERTS * 2)
+
+    async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
+        results = await asyncio.gather(*(
+            upsert_batch_async(session, sem, endpoint, batch, key_columns) for batch in batches
+        ))
+    return [index for saved in results for index in saved]
+
+
+def conflict_clause(columns: list, key_columns: list):
+    """ON CONFLICT clause updating the given non-key columns"""
+    update_columns = [column for column in columns if column not in key_columns]
+    if update_columns:
+        action = sql.SQL("DO UPDATE SET {}").format(sql.SQL(', ').join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(column)) for column in update_columns
+        ))
+    else:
+        action = sql.SQL("DO NOTHING")
+
+    return sql.SQL("ON CONFLICT ({}) {}").format(
+        sql.SQL(', ').join(map(sql.Identifier, key_columns)),
+        action,
+    )
+
+
+def upsert_statement(table: str, columns: list, key_columns: list):
+    """INSERT ... ON CONFLICT DO UPDATE for the given columns, VALUES left to execute_values"""
+    return sql.SQL("INSERT INTO {} ({}) VALUES %s {}").format(
+        sql.Identifier(table),
+        sql.SQL(', ').join(map(sql.Identifier, columns)),
+        conflict_clause(columns, key_columns),
+    )
+
+
+def merge_statement(table: str, columns: list, key_columns: list):
+    """INSERT ... SELECT of the staged rows, typed by the table's row type, ON CONFLICT DO UPDATE"""
+    return sql.SQL(
+        "INSERT INTO {table} ({columns}) SELECT {staged} FROM {staging} s, "
+        "jsonb_populate_record(NULL::{table}, s.doc) r {conflict}"
+    ).format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(', ').join(map(sql.Identifier, columns)),
+        staged=sql.SQL(', ').join(sql.Identifier('r', column) for column in columns),
+        staging=sql.Identifier(STAGING_TABLE),
+        conflict=conflict_clause(columns, key_columns),
+    )
+
+
+def copy_batch(cur, batch: list):
+    """COPY a batch into the staging table, one JSON document per row"""
+    buffer = io.BytesIO()
+    for data, _ in batch:
+        # COPY text format treats backslashes as escapes
+        buffer.write(dumps_json_bytes(data).replace(b'\\', b'\\\\'))
+        buffer.write(b'\n')
+    buffer.seek(0)
+    cur.copy_expert(sql.SQL("COPY {} (doc) FROM STDIN").format(sql.Identifier(STAGING_TABLE)), buffer)
+
+
+def row_values(data: dict, columns: list) -> tuple:
+    """Row values in column order, with dicts adapted to JSONB"""
+    return tuple(Json(value) if isinstance(value, dict) else value for value in map(data.get, columns))
+
+
+def upsert_batches_pg(db_url: str, table: str, batches: list, on_conflict: str) -> list:
+    """Send batches over a direct Postgres connection with COPY
+
+    Each batch is copied into a temp staging table and merged into the
+    table with a single INSERT ... SELECT ... ON CONFLICT, so Postgres
+    parses and plans one statement per batch rather than one per row.
+    Each batch is committed on its own, so a failed batch is rolled back
+    and retried row by row with execute_values without losing the
+    batches before it. Transient failures are retried first, on a new
+    connection when the old one was lost.
+    """
+    key_columns = on_conflict.split(',')
+    saved = []
+    conn = None
+
+    def connection():
+        """Open connection, reconnecting (and recreating the session's staging table) once lost"""
+        nonlocal conn
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(db_url)
+            with conn, conn.cursor() as cur:
+                cur.execute(sql.SQL("CREATE TEMP TABLE IF NOT EXISTS {} (doc JSONB) ON COMMIT DELETE ROWS").format(
+                    sql.Identifier(STAGING_TABLE)
+                ))
+        return conn
+
+    def merge_batch(batch: list, columns: list) -> None:
+        with connection() as db, db.cursor() as cur:
+            copy_batch(cur, batch)
+            cur.execute(merge_statement(table, columns, key_columns))
+
+    def upsert_row(statement, data: dict, columns: list) -> None:
+        with connection() as db, db.cursor() as cur:
+            execute_values(cur, statement, [row_values(data, columns)])
+
+    # Connect up front so an unreachable database fails the whole call
+    connection()
+    try:
+        for batch in batches:
+            columns = list(batch[0][0])
+            try:
+                with_retries(lambda: merge_batch(batch, columns))
+                for _, indices in batch:
+                    saved.extend(indices)
+            except Exception as e:
+                print(f"[Supabase] Batch upsert failed ({e}), retrying {len(batch)} rows individually", file=sys.stderr)
+                statement = upsert_statement(table, columns, key_columns)
+                for data, indices in batch:
+                    try:
+                        with_retries(lambda: upsert_row(statement, data, columns))
+                        saved.extend(indices)
+                    except Exception as e:
+                        print(f"[ERROR] Failed to save {row_label(data, key_columns)}: {e}", file=sys.stderr)
+    finally:
+        conn.close()
+
+    return saved
+
+
+def upsert_rows(supabase, table: str, rows: list, on_conflict: str = 'platform,platform_id') -> list:
+    """Upsert rows in batches, returning the indices of the rows that were saved
+
+    With psycopg2 available and SUPABASE_DB_URL set, the batches go straight
+    to Postgres. Otherwise, with aiohttp available, they go concurrently to
+    PostgREST using the client's URL and key, or failing that one after
+    another through the supabase client. On every path, connection errors,
+    timeouts and 5xx responses are retried with backoff, then a failed batch
+    is retried row by row so one bad record only loses itself.
+    """
+    batches = plan_batches(rows, on_conflict.split(','))
+
+    db_url = os.environ.get('SUPABASE_DB_URL')
+    supabase_url = getattr(supabase, 'supabase_url', None)
+    supabase_key = getattr(supabase, 'supabase_key', None)
+    saved = None
+    if PSYCOPG2_AVAILABLE and db_url:
+        try:
+            saved = upsert_batches_pg(db_url, table, batches, on_conflict)
+        except psycopg2.OperationalError as e:
+            print(f"[Supabase] Postgres connection failed ({e}), upserting through the API", file=sys.stderr)
+
+    if saved is None:
+        if AIOHTTP_AVAILABLE and supabase_url and supabase_key:
+            saved = asyncio.run(upsert_batches_async(supabase_url, supabase_key, table, batches, on_conflict))
+        else:
+            saved = upsert_batches(supabase, table, batches, on_conflict)
+
+    saved.sort()
+    return saved
@@ -4,7 +4,9 @@
  */
 
 import { spawn } from 'child_process';
+import { once } from 'events';
 import * as path from 'path';
+import * as readline from 'readline';
 import { ScrapedListing, Platform, ScrapeJob } from '../types.js';
 import { createClient, SupabaseClient } from '@supabase/supabase-js';
 
@@ -71,11 +73,23 @@ export class AirbnbPythonScraper {
         }
       });
 
-      let stdout = '';
+      // Listings arrive as NDJSON (one per line) and are parsed as they stream in
+      const listings: AirbnbListing[] = [];
+      let parseError: unknown = null;
+      let badLine = '';
       let stderr = '';
 
-      pythonProcess.stdout.on('data', (data) => {
-        stdout += data.toString();
+      const lines = readline.createInterface({ input: pythonProcess.stdout });
+      const linesDone = once(lines, 'close');
+
+      lines.on('line', (line) => {
+        if (parseError || !line.trim()) return;
+        try {
+          listings.push(JSON.parse(line));
+        } catch (e) {
+          parseError = e;
+          badLine = line;
+        }
       });
 
       pythonProcess.stderr.on('data', (data) => {
@@ -93,9 +107,16 @@ export class AirbnbPythonScraper {
           return;
         }
 
+        await linesDone;
+
+        if (parseError) {
+          console.error(`[Airbnb] Failed to parse Python output: ${parseError}`);
+          console.error(`[Airbnb] line was: ${badLine.substring(0, 500)}...`);
+          reject(parseError);
+          return;
+        }
+
         try {
-          // Parse JSON output
-          const listings: AirbnbListing[] = JSON.parse(stdout);
           console.log(`[Airbnb] Received ${listings.length} listings from Python`);
 
           // Convert to ScrapedListing format
@@ -103,8 +124,7 @@ export class AirbnbPythonScraper {
 
           resolve(scrapedListings);
         } catch (e) {
-          console.error(`[Airbnb] Failed to parse Python output: ${e}`);
-          console.error(`[Airbnb] stdout was: ${stdout.substring(0, 500)}...`);
+          console.error(`[Airbnb] Failed to convert Python output: ${e}`);
           reject(e);
         }
       });
@@ -0,0 +1,70 @@
+-- Multi-Property Owner Aggregation
+-- Migration: 00015_multi_property_owners.sql
+-- Lets analyze_owners.py fetch grouped owners instead of every scraped listing
+
+-- Last 9 digits of a listing's phone (raw_data phone, else phoneNumber)
+CREATE OR REPLACE FUNCTION listing_phone_digits(raw JSONB)
+RETURNS TEXT AS $$
+  SELECT CASE WHEN length(d.digits) >= 9 THEN right(d.digits, 9) END
+  FROM (
+    SELECT regexp_replace(
+      COALESCE(NULLIF(raw->>'phone', ''), NULLIF(raw->>'phoneNumber', '')),
+      '\D', '', 'g'
+    ) AS digits
+  ) d;
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Owners (by phone or host_id) with at least min_count listings,
+-- largest first, with their first three listings as a sample
+CREATE OR REPLACE FUNCTION get_multi_owners(min_count INTEGER DEFAULT 2)
+RETURNS TABLE (
+  match_type TEXT,
+  owner_key TEXT,
+  listing_count BIGINT,
+  sample_listings JSONB
+) AS $$
+  WITH owner_listings AS (
+    SELECT 'phone' AS match_type, listing_phone_digits(sl.raw_data) AS owner_key,
+      sl.id, sl.title, sl.platform, sl.host_name, sl.url
+    FROM scraped_listings sl
+    UNION ALL
+    SELECT 'host_id' AS match_type, NULLIF(sl.host_id, '') AS owner_key,
+      sl.id, sl.title, sl.platform, sl.host_name, sl.url
+    FROM scraped_listings sl
+  )
+  SELECT
+    ol.match_type,
+    ol.owner_key,
+    COUNT(*) AS listing_count,
+    to_jsonb((array_agg(
+      jsonb_build_object(
+        'title', left(COALESCE(ol.title, ''), 50),
+        'platform', ol.platform,
+        'host_name', ol.host_name,
+        'url', ol.url
+      ) ORDER BY ol.id
+    ))[1:3]) AS sample_listings
+  FROM owner_listings ol
+  WHERE ol.owner_key IS NOT NULL
+  GROUP BY ol.match_type, ol.owner_key
+  HAVING COUNT(*) >= min_count
+  ORDER BY ol.match_type, COUNT(*) DESC, MIN(ol.id::TEXT);
+$$ LANGUAGE sql STABLE;
+
+-- Listing and phone totals for the owner report
+CREATE OR REPLACE FUNCTION get_owner_stats()
+RETURNS TABLE (
+  total_listings BIGINT,
+  listings_with_phone BIGINT,
+  unique_phones BIGINT
+) AS $$
+  SELECT
+    COUNT(*) AS total_listings,
+    COUNT(listing_phone_digits(sl.raw_data)) AS listings_with_phone,
+    COUNT(DISTINCT listing_phone_digits(sl.raw_data)) AS unique_phones
+  FROM scraped_listings sl;
+$$ LANGUAGE sql STABLE;
+
+-- View for the dashboard: every owner with more than one listing
+CREATE OR REPLACE VIEW multi_property_owners AS
+SELECT * FROM get_multi_owners(2);
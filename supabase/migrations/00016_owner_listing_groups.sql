@@ -0,0 +1,65 @@
+-- Owner Listing Groups
+-- Migration: 00016_owner_listing_groups.sql
+-- Lets owner_detection.py fetch listings already grouped by owner instead of every active listing
+
+-- Phone in +221XXXXXXXXX format: digits only, any 00221 / 221 / 0 prefix
+-- dropped, then a 9 digit number starting with 7 or 3 (else NULL)
+CREATE OR REPLACE FUNCTION normalize_owner_phone(phone TEXT)
+RETURNS TEXT AS $$
+  SELECT '+221' || substring(
+    regexp_replace(phone, '\D', '', 'g')
+    FROM '^(?:00221|221|0)?([37][0-9]{8})$'
+  );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Normalized phone of a listing: the first of its raw_data phone fields that normalizes
+CREATE OR REPLACE FUNCTION listing_owner_phone(raw JSONB)
+RETURNS TEXT AS $$
+  SELECT COALESCE(
+    normalize_owner_phone(raw->>'phone'),
+    normalize_owner_phone(raw->>'phoneNumber'),
+    normalize_owner_phone(raw->>'whatsapp'),
+    normalize_owner_phone(raw->>'contact_phone')
+  );
+$$ LANGUAGE sql IMMUTABLE;
+
+-- Active listings grouped by owner: by normalized phone, then by
+-- platform:host_id (Airbnb, Booking) for listings without a phone group.
+-- Each group carries the listing fields save_owners_to_db aggregates.
+CREATE OR REPLACE FUNCTION get_listing_groups()
+RETURNS TABLE (
+  match_type TEXT,
+  identifier TEXT,
+  listings JSONB
+) AS $$
+  WITH active AS (
+    SELECT sl.id, sl.platform::TEXT AS platform, sl.host_id, sl.host_name, sl.price,
+      listing_owner_phone(sl.raw_data) AS phone
+    FROM scraped_listings sl
+    WHERE sl.is_active
+  ),
+  keyed AS (
+    SELECT 'phone' AS match_type, a.phone AS identifier, a.*
+    FROM active a
+    WHERE a.phone IS NOT NULL
+    UNION ALL
+    SELECT 'host_id' AS match_type, a.platform || ':' || a.host_id AS identifier, a.*
+    FROM active a
+    WHERE a.phone IS NULL
+      AND NULLIF(a.host_id, '') IS NOT NULL
+      AND a.platform IN ('airbnb', 'booking')
+  )
+  SELECT
+    k.match_type,
+    k.identifier,
+    jsonb_agg(jsonb_build_object(
+      'id', k.id,
+      'platform', k.platform,
+      'host_id', k.host_id,
+      'host_name', k.host_name,
+      'price', k.price
+    ) ORDER BY k.id) AS listings
+  FROM keyed k
+  GROUP BY k.match_type, k.identifier
+  ORDER BY k.match_type DESC, k.identifier;
+$$ LANGUAGE sql STABLE;
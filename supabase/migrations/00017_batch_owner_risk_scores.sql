@@ -0,0 +1,11 @@
+-- Batch Owner Risk Scores
+-- Migration: 00017_batch_owner_risk_scores.sql
+-- Lets owner_detection.py score every saved owner in one call instead of one call per owner
+
+-- Recalculate the risk score of each owner (see calculate_owner_risk_score),
+-- returning how many owners were scored
+CREATE OR REPLACE FUNCTION calculate_owner_risk_scores(owner_ids_param UUID[])
+RETURNS INTEGER AS $$
+  SELECT COUNT(calculate_owner_risk_score(owner_id))::INTEGER
+  FROM unnest(owner_ids_param) AS owner_id;
+$$ LANGUAGE sql;
@@ -0,0 +1,12 @@
+-- Approximate Row Count
+-- Migration: 00018_approx_row_count.sql
+-- Lets save_hotels.py report the size of scraped_listings without a full count(*) scan
+
+-- Planner estimate of a table's rows, as of its last VACUUM / ANALYZE
+-- (0 for a table never analyzed, NULL for an unknown table)
+CREATE OR REPLACE FUNCTION approx_row_count(tbl TEXT)
+RETURNS BIGINT AS $$
+  SELECT GREATEST(reltuples, 0)::BIGINT
+  FROM pg_class
+  WHERE oid = to_regclass(tbl);
+$$ LANGUAGE sql STABLE;